@@ -0,0 +1,45 @@
+"""project remaining amount
+
+Revision ID: 0b6e3d5a8c21
+Revises: f4d2b7e9a613
+Create Date: 2026-10-18 19:22:08.417356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e3d5a8c21'
+down_revision: Union[str, None] = 'f4d2b7e9a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite не добавляет хранимую вычисляемую колонку через ALTER TABLE,
+    # поэтому там таблица пересоздается.
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table('charityproject', recreate=recreate) as batch_op:
+        batch_op.add_column(sa.Column(
+            'remaining_amount', sa.Integer(),
+            sa.Computed('full_amount - invested_amount', persisted=True),
+            nullable=True
+        ))
+    op.create_index(
+        'ix_charityproject_open_remaining', 'charityproject',
+        ['remaining_amount', 'create_date', 'id'], unique=False,
+        sqlite_where=sa.text('fully_invested = 0'),
+        postgresql_where=sa.text('fully_invested = false')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_charityproject_open_remaining', table_name='charityproject'
+    )
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table('charityproject', recreate=recreate) as batch_op:
+        batch_op.drop_column('remaining_amount')
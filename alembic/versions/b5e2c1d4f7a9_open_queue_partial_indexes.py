@@ -0,0 +1,40 @@
+"""open queue partial indexes
+
+Revision ID: b5e2c1d4f7a9
+Revises: 98477097098b
+Create Date: 2026-10-18 10:12:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2c1d4f7a9'
+down_revision: Union[str, None] = '98477097098b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_charityproject_open_queue', 'charityproject',
+        ['create_date', 'id'], unique=False,
+        sqlite_where=sa.text('fully_invested = 0'),
+        postgresql_where=sa.text('fully_invested = false')
+    )
+    op.create_index(
+        'ix_donation_open_queue', 'donation',
+        ['create_date', 'id'], unique=False,
+        sqlite_where=sa.text('fully_invested = 0'),
+        postgresql_where=sa.text('fully_invested = false')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_donation_open_queue', table_name='donation')
+    op.drop_index(
+        'ix_charityproject_open_queue', table_name='charityproject'
+    )
@@ -0,0 +1,27 @@
+"""donation user index
+
+Revision ID: f4d2b7e9a613
+Revises: c81f5b0e9d47
+Create Date: 2026-10-18 18:41:27.530962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4d2b7e9a613'
+down_revision: Union[str, None] = 'c81f5b0e9d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_donation_user_id', 'donation', ['user_id', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_donation_user_id', table_name='donation')
@@ -1,3 +1,4 @@
 from .charity_project import router as charityproject_router # noqa
 from .user import router as user_router # noqa
 from .donation import router as donation_router # noqa
+from .summary import router as summary_router # noqa
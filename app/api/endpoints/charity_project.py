@@ -1,35 +1,133 @@
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.charity_project import (CharityProjectDB,
+from app.schemas.charity_project import (CharityProjectBatchUpdate,
+                                         CharityProjectDB,
                                          CharityProjectCreate,
                                          CharityProjectUpdate)
+from app.schemas.investment import InvestmentDB
+from app.schemas.preview import CharityProjectPreview
 from app.core.db import get_async_session
 from app.crud.charity_project import charityproject_crud
-from app.api.validators import (check_name_duplicate,
+from app.crud.investment import investment_crud
+from app.api.validators import (check_charityproject_exists,
+                                check_name_duplicate,
                                 check_project_before_delete,
-                                check_project_before_edit)
+                                check_project_before_edit,
+                                check_projects_before_batch_create,
+                                check_projects_before_batch_edit)
+from app.api.pagination import PageParams, page_key, page_params, take_page
 from app.core.user import current_superuser
+from app.models import CharityProject
+from app.core.config import settings
+from app.services.export import export_ndjson
+from app.services.preview import preview_cache
+from app.services.response_cache import (data_version, make_etag,
+                                         not_modified, project_list_cache)
+from app.services.serialization import dump_rows, schema_fields
+from app.services.worker import investment_worker
 
 router = APIRouter(prefix='/charity_project', tags=['charity_projects'])
 
+PROJECT_FIELDS = schema_fields(CharityProjectDB)
+PROJECT_BRIEF_FIELDS = schema_fields(CharityProjectDB, exclude={'description'})
+
+PROJECT_ORDERINGS = {
+    'id': (),
+    'remaining': ('remaining_amount', 'create_date'),
+    'create_date': ('create_date',),
+}
+
 
 @router.get(
     '/',
     response_model=List[CharityProjectDB],
-    response_model_exclude_none=True
+    response_model_exclude_none=True,
+    dependencies=[Depends(investment_worker.flush)]
 )
 async def get_all_charity_projects(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fully_invested: Optional[bool] = None,
+    order_by: Literal['id', 'remaining', 'create_date'] = 'id',
+    exclude: Optional[Literal['description']] = Query(
+        None, description='description - не выдавать описания проектов'
+    ),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Получает список проектов постранично.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+     С параметром paginate=false возвращается весь список.
+     Параметр fully_invested оставляет только закрытые (true) или только
+     открытые (false) проекты. Параметр order_by задает порядок:
+     id (по умолчанию), remaining - по возрастанию недостающей суммы,
+     create_date - по дате создания. С параметром exclude=description
+     описания проектов не читаются из базы данных и не выдаются.
+
+    Готовые ответы кэшируются по версии данных таблицы проектов.
+     Ответ содержит ETag; на запрос с совпадающим If-None-Match
+     возвращается 304 Not Modified без чтения проектов.
+    """
+    ordering = PROJECT_ORDERINGS[order_by]
+    after = page_key(page, CharityProject, ordering)
+    version = await data_version(session, CharityProject)
+    etag = make_etag(
+        version, CharityProject.__tablename__, page, fully_invested, order_by,
+        exclude
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    key = (version, page, fully_invested, order_by, exclude)
+    cached = project_list_cache.get(key)
+    if cached is None:
+        fields = PROJECT_BRIEF_FIELDS if exclude else PROJECT_FIELDS
+        rows = await charityproject_crud.get_multi_rows(
+            session, fields, after,
+            page.limit and page.limit + 1, ordering,
+            None if fully_invested is None else {
+                'fully_invested': fully_invested
+            }
+        )
+        rows = take_page(response, rows, page, ordering)
+        response.headers['ETag'] = etag
+        cached = project_list_cache.put(
+            key, dump_rows(rows, fields), response.headers
+        )
+    return cached.response(request.headers.get('accept-encoding', ''))
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[
+        Depends(current_superuser), Depends(investment_worker.flush)
+    ]
+)
+async def export_charity_projects(
     session: AsyncSession = Depends(get_async_session)
 ):
     """
-    Получает список всех проектов.
+    Только для суперюзеров.
+
+    Выгружает все проекты в формате NDJSON: по одному объекту JSON
+     на строку, в порядке ID. Ответ передается потоком по мере чтения
+     из базы данных.
     """
-    projects = await charityproject_crud.get_multi(session)
-    return projects
+    return StreamingResponse(
+        export_ndjson(
+            session.bind, CharityProject, CharityProjectDB,
+            settings.export_chunk_size
+        ),
+        media_type='application/x-ndjson'
+    )
 
 
 @router.post(
@@ -52,6 +150,99 @@ async def create_charity_project(
     return new_project
 
 
+@router.post(
+    '/batch',
+    response_model=List[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)]
+)
+async def create_charity_project_batch(
+    projects: List[CharityProjectCreate],
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Создает пакет проектов в одной транзакции. Имена проверяются
+     на уникальность для всего пакета сразу, ошибки возвращаются
+     по позициям в пакете.
+    """
+    await check_projects_before_batch_create(projects, session)
+    new_projects = await charityproject_crud.create_batch(projects, session)
+    return new_projects
+
+
+@router.post(
+    '/preview',
+    response_model=CharityProjectPreview,
+    dependencies=[
+        Depends(current_superuser), Depends(investment_worker.flush)
+    ]
+)
+async def preview_charity_project(
+    project: CharityProjectCreate,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Показывает, какая сумма была бы вложена в проект сразу после создания
+     и из каких пожертвований. Проект не создается, база данных
+     не изменяется.
+    """
+    preview = await preview_cache.preview(
+        session, CharityProject, project.full_amount
+    )
+    return {
+        'invested_amount': preview.invested_amount,
+        'fully_invested': preview.fully_invested,
+        'donations': [
+            {'donation_id': donation_id, 'amount': amount}
+            for donation_id, amount in preview.allocations
+        ],
+    }
+
+
+@router.patch(
+    '/batch',
+    response_model=List[CharityProjectDB],
+    dependencies=[Depends(current_superuser)]
+)
+async def update_charity_project_batch(
+    projects_in: List[CharityProjectBatchUpdate],
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Обновляет пакет проектов в одной транзакции по тем же правилам,
+     что и обновление одного проекта. Ошибки возвращаются по позициям
+     в пакете.
+    """
+    projects = await check_projects_before_batch_edit(projects_in, session)
+    updated_projects = await charityproject_crud.update_batch(
+        projects_in, projects, session
+    )
+    return updated_projects
+
+
+@router.get(
+    '/{project_id}',
+    response_model=CharityProjectDB,
+    response_model_exclude_none=True,
+    dependencies=[Depends(investment_worker.flush)]
+)
+async def get_charity_project(
+    project_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Получает проект по ID.
+    """
+    project = await check_charityproject_exists(project_id, session)
+    return project
+
+
 @router.delete(
     '/{project_id}',
     response_model=CharityProjectDB,
@@ -98,3 +289,25 @@ async def update_charity_project(
         project_in, project, session
     )
     return updated_project
+
+
+@router.get(
+    '/{project_id}/investments',
+    response_model=List[InvestmentDB],
+    dependencies=[
+        Depends(current_superuser), Depends(investment_worker.flush)
+    ]
+)
+async def get_charity_project_investments(
+    project_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Получает поступления в проект: из каких пожертвований и в каком размере
+     он был профинансирован.
+    """
+    await check_charityproject_exists(project_id, session)
+    investments = await investment_crud.get_by_project(project_id, session)
+    return investments
@@ -1,34 +1,107 @@
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.donation import DonationDB, DonationCreate, DonationDBShort
+from app.schemas.donation import (DonationDB, DonationCreate, DonationDBShort,
+                                  DonationStatus)
+from app.schemas.investment import InvestmentDB
+from app.schemas.preview import DonationPreview
 from app.core.user import current_superuser, current_user
 from app.core.db import get_async_session
 from app.crud.donation import donation_crud
-from app.models import User
+from app.crud.investment import investment_crud
+from app.api.validators import check_batch_size, check_donation_access
+from app.api.pagination import PageParams, page_key, page_params, take_page
+from app.core.config import settings
+from app.services.export import export_ndjson
+from app.services.preview import preview_cache
+from app.services.response_cache import (data_version, make_etag,
+                                         not_modified)
+from app.services.serialization import rows_response, schema_fields
+from app.services.worker import investment_worker
+from app.models import Donation, User
 
 router = APIRouter(prefix='/donation', tags=['donations'])
 
+DONATION_FIELDS = schema_fields(DonationDB)
+DONATION_BRIEF_FIELDS = schema_fields(DonationDB, exclude={'comment'})
+MY_DONATION_FIELDS = schema_fields(DonationDBShort)
+MY_DONATION_BRIEF_FIELDS = schema_fields(DonationDBShort, exclude={'comment'})
+
 
 @router.get(
     '/',
     response_model=List[DonationDB],
     response_model_exclude_none=True,
-    dependencies=[Depends(current_superuser)]
+    dependencies=[
+        Depends(current_superuser), Depends(investment_worker.flush)
+    ]
 )
 async def get_all_donations(
+        request: Request,
+        response: Response,
+        page: PageParams = Depends(page_params),
+        exclude: Optional[Literal['comment']] = Query(
+            None,
+            description='comment - не выдавать комментарии к пожертвованиям'
+        ),
         session: AsyncSession = Depends(get_async_session)
 ):
     """
     Только для суперюзеров.
 
-    Получиает все пожертвования.
+    Получиает пожертвования постранично в порядке ID.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+     С параметром paginate=false возвращается весь список.
+     С параметром exclude=comment комментарии не читаются из базы данных
+     и не выдаются.
+     На запрос с If-None-Match, совпадающим с ETag ответа, возвращается
+     304 Not Modified без чтения пожертвований.
     """
-    donations = await donation_crud.get_multi(session)
-    return donations
+    after = page_key(page, Donation)
+    etag = make_etag(
+        await data_version(session, Donation), Donation.__tablename__, page,
+        exclude
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers['ETag'] = etag
+    fields = DONATION_BRIEF_FIELDS if exclude else DONATION_FIELDS
+    rows = await donation_crud.get_multi_rows(
+        session, fields, after, page.limit and page.limit + 1
+    )
+    rows = take_page(response, rows, page)
+    return rows_response(rows, fields, response.headers)
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[
+        Depends(current_superuser), Depends(investment_worker.flush)
+    ]
+)
+async def export_donations(
+        session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Выгружает все пожертвования в формате NDJSON: по одному объекту JSON
+    на строку, в порядке ID. Ответ передается потоком по мере чтения
+    из базы данных.
+    """
+    return StreamingResponse(
+        export_ndjson(
+            session.bind, Donation, DonationDB, settings.export_chunk_size
+        ),
+        media_type='application/x-ndjson'
+    )
 
 
 @router.post(
@@ -48,17 +121,150 @@ async def create_donation(
     return new_donation
 
 
+@router.post(
+    '/batch',
+    response_model=List[DonationStatus]
+)
+async def create_donation_batch(
+    donations: List[DonationCreate],
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user)
+):
+    """
+    Создает пакет пожертвований.
+
+    Пакет сохраняется целиком или не сохраняется вовсе, после чего
+    средства распределяются одним проходом. Возвращает ID и состояние
+    пожертвований в порядке пакета.
+    """
+    check_batch_size(donations)
+    statuses = await donation_crud.create_batch(donations, session, user)
+    return statuses
+
+
+@router.post(
+    '/preview',
+    response_model=DonationPreview,
+    dependencies=[Depends(current_user), Depends(investment_worker.flush)]
+)
+async def preview_donation(
+    donation: DonationCreate,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Показывает, в какие проекты и в каком размере было бы вложено
+    пожертвование сразу после создания. Пожертвование не создается,
+    база данных не изменяется.
+    """
+    preview = await preview_cache.preview(
+        session, Donation, donation.full_amount
+    )
+    return {
+        'invested_amount': preview.invested_amount,
+        'fully_invested': preview.fully_invested,
+        'projects': [
+            {'project_id': project_id, 'amount': amount}
+            for project_id, amount in preview.allocations
+        ],
+    }
+
+
 @router.get(
     '/my',
     response_model=List[DonationDBShort],
-    response_model_exclude_none=True
+    response_model_exclude_none=True,
+    dependencies=[Depends(investment_worker.flush)]
 )
 async def get_user_donations(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    status: Optional[Literal['open', 'closed']] = None,
+    exclude: Optional[Literal['comment']] = Query(
+        None, description='comment - не выдавать комментарии к пожертвованиям'
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user)
+):
+    """
+    Получиает пожертвования текущего пользователя постранично в порядке ID.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+     С параметром status=open возвращаются только открытые пожертвования,
+     с status=closed - только полностью вложенные. С параметром
+     exclude=comment комментарии не читаются из базы данных и не выдаются.
+     На запрос с If-None-Match, совпадающим с ETag ответа, возвращается
+     304 Not Modified без чтения пожертвований.
+    """
+    after = page_key(page, Donation)
+    etag = make_etag(
+        await data_version(session, Donation), 'my', user.id, page, status,
+        exclude
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers['ETag'] = etag
+    fields = MY_DONATION_BRIEF_FIELDS if exclude else MY_DONATION_FIELDS
+    rows = await donation_crud.get_by_user(
+        session, user, fields, after, page.limit and page.limit + 1,
+        None if status is None else status == 'closed'
+    )
+    rows = take_page(response, rows, page)
+    return rows_response(rows, fields, response.headers)
+
+
+@router.get(
+    '/{donation_id}',
+    response_model=DonationDB,
+    response_model_exclude_none=True,
+    dependencies=[Depends(investment_worker.flush)]
+)
+async def get_donation(
+    donation_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user)
+):
+    """
+    Получает пожертвование по ID.
+
+    Доступно автору пожертвования и суперюзерам.
+    """
+    donation = await check_donation_access(donation_id, user, session)
+    return donation
+
+
+@router.api_route(
+    '/{donation_id}',
+    methods=['PATCH', 'DELETE'],
+    include_in_schema=False
+)
+async def modify_donation():
+    """
+    Пожертвования нельзя изменять и удалять.
+
+    Без этого маршрута запросы PATCH и DELETE к адресу пожертвования
+     получали бы 405 из-за маршрута GET; отвечаем 404, как до его
+     появления.
+    """
+    raise HTTPException(status_code=404, detail='Not Found')
+
+
+@router.get(
+    '/{donation_id}/investments',
+    response_model=List[InvestmentDB],
+    dependencies=[Depends(investment_worker.flush)]
+)
+async def get_donation_investments(
+    donation_id: int,
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user)
 ):
     """
-    Получиает все пожертвования текущего пользователя.
+    Получает проекты, профинансированные из пожертвования.
+
+    Доступно автору пожертвования и суперюзерам.
     """
-    donations = await donation_crud.get_by_user(session, user)
-    return donations
+    await check_donation_access(donation_id, user, session)
+    investments = await investment_crud.get_by_donation(donation_id, session)
+    return investments
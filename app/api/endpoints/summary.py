@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.summary import FundsSummaryDB, ResponseCacheStats
+from app.core.db import get_async_session
+from app.core.user import current_superuser
+from app.models import FundsSummary
+from app.models.summary import SUMMARY_ID
+from app.services.response_cache import project_list_cache
+from app.services.worker import investment_worker
+
+router = APIRouter(prefix='/summary', tags=['summary'])
+
+
+@router.get(
+    '/',
+    response_model=FundsSummaryDB,
+    dependencies=[Depends(investment_worker.flush)]
+)
+async def get_summary(
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Получает сводку по открытым пожертвованиям и проектам.
+    """
+    summary = await session.scalar(
+        select(FundsSummary).where(FundsSummary.id == SUMMARY_ID)
+    )
+    return summary
+
+
+@router.get(
+    '/cache',
+    response_model=ResponseCacheStats,
+    dependencies=[Depends(current_superuser)]
+)
+async def get_cache_stats():
+    """
+    Только для суперюзеров.
+
+    Получает счетчики кэша готовых ответов списка проектов.
+    """
+    return project_list_cache.stats()
@@ -0,0 +1,215 @@
+import base64
+import binascii
+import datetime as dt
+import json
+from typing import Any, NamedTuple, Optional, Sequence, Tuple, Type
+
+from fastapi import Query, Response
+from fastapi.exceptions import HTTPException
+
+from app.core.config import settings
+from app.core.db import Base
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class PageParams(NamedTuple):
+    """
+    Параметры страницы списка.
+
+    Attributes:
+        after (Optional[Tuple]): Ключ сортировки последнего объекта
+            предыдущей страницы в том виде, в каком он пришел в курсоре;
+            None - страница с начала списка.
+        limit (Optional[int]): Размер страницы; None - весь список.
+    """
+    after: Optional[Tuple]
+    limit: Optional[int]
+
+
+def bad_cursor() -> HTTPException:
+    """
+    Возвращает ошибку поврежденного или неподходящего курсора.
+
+    Returns:
+        HTTPException: Ошибка со статус-кодом 422.
+    """
+    return HTTPException(
+        status_code=422,
+        detail='Некорректный курсор!'
+    )
+
+
+def encode_cursor(
+    *key: Any
+) -> str:
+    """
+    Кодирует ключ сортировки последнего объекта страницы в непрозрачный
+     курсор.
+
+    Args:
+        *key (Any): Значения колонок сортировки; последнее - ID.
+
+    Returns:
+        str: Курсор следующей страницы.
+    """
+    payload = json.dumps(
+        list(key), default=dt.datetime.isoformat, separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(
+    cursor: str
+) -> Tuple:
+    """
+    Раскодирует курсор в ключ сортировки последнего объекта предыдущей
+     страницы.
+
+    Курсор из одного ID без списка тоже принимается.
+
+    Args:
+        cursor (str): Курсор.
+
+    Returns:
+        Tuple: Значения ключа сортировки.
+
+    Raises:
+        HTTPException: Если курсор поврежден.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise bad_cursor()
+    if not isinstance(key, list):
+        key = [key]
+    if not key or not all(
+        isinstance(value, (int, str)) and not isinstance(value, bool)
+        for value in key
+    ):
+        raise bad_cursor()
+    return tuple(key)
+
+
+def page_params(
+    cursor: Optional[str] = Query(
+        None, description='Курсор из заголовка X-Next-Cursor'
+    ),
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(
+        settings.page_size, ge=1, le=settings.page_size_max
+    ),
+    paginate: bool = Query(
+        True, description='false - вернуть весь список одним ответом'
+    )
+) -> PageParams:
+    """
+    Разбирает параметры страницы списка.
+
+    Страницы выбираются по ключу сортировки: следующая начинается
+     после ключа последнего объекта предыдущей. Параметр after_id
+     задает ключ из одного ID и применим только к порядку по ID.
+
+    Returns:
+        PageParams: Параметры страницы.
+
+    Raises:
+        HTTPException: Если указаны и курсор, и after_id.
+    """
+    if not paginate:
+        return PageParams(None, None)
+    if cursor is not None:
+        if after_id is not None:
+            raise HTTPException(
+                status_code=422,
+                detail='Укажите либо cursor, либо after_id'
+            )
+        return PageParams(decode_cursor(cursor), limit)
+    return PageParams(None if after_id is None else (after_id,), limit)
+
+
+def sort_key(
+    order_by: Sequence[str] = ()
+) -> Tuple[str, ...]:
+    """
+    Возвращает имена колонок ключа сортировки: колонки порядка и ID.
+
+    Args:
+        order_by (Sequence[str]): Колонки сортировки перед ID.
+
+    Returns:
+        Tuple[str, ...]: Имена колонок ключа.
+    """
+    return (*order_by, 'id')
+
+
+def page_key(
+    params: PageParams,
+    model: Type[Base],
+    order_by: Sequence[str] = ()
+) -> Optional[Tuple]:
+    """
+    Проверяет ключ из курсора по колонкам сортировки и приводит его
+     значения к типам колонок.
+
+    Args:
+        params (PageParams): Параметры страницы.
+        model (Type[Base]): Модель списка.
+        order_by (Sequence[str]): Колонки сортировки перед ID.
+
+    Returns:
+        Optional[Tuple]: Ключ, после которого начинается страница,
+        или None для первой страницы.
+
+    Raises:
+        HTTPException: Если ключ не подходит к порядку сортировки.
+    """
+    if params.after is None:
+        return None
+    columns = [model.__table__.c[name] for name in sort_key(order_by)]
+    if len(params.after) != len(columns):
+        raise bad_cursor()
+    key = []
+    for value, column in zip(params.after, columns):
+        kind = column.type.python_type
+        if kind is dt.datetime and isinstance(value, str):
+            try:
+                value = dt.datetime.fromisoformat(value)
+            except ValueError:
+                raise bad_cursor()
+        if not isinstance(value, kind):
+            raise bad_cursor()
+        key.append(value)
+    return tuple(key)
+
+
+def take_page(
+    response: Response,
+    objs: Sequence,
+    params: PageParams,
+    order_by: Sequence[str] = ()
+) -> Sequence:
+    """
+    Обрезает выборку до размера страницы и передает курсор следующей
+     страницы в заголовке X-Next-Cursor.
+
+    Args:
+        response (Response): Ответ эндпоинта.
+        objs (Sequence): Выборка, запрошенная с лимитом на один объект
+            больше размера страницы. Объекты должны содержать колонки
+            ключа сортировки.
+        params (PageParams): Параметры страницы.
+        order_by (Sequence[str]): Колонки сортировки перед ID.
+
+    Returns:
+        Sequence: Объекты страницы.
+    """
+    if params.limit is None or len(objs) <= params.limit:
+        return objs
+    objs = objs[:params.limit]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+        *(getattr(objs[-1], name) for name in sort_key(order_by))
+    )
+    return objs
@@ -1,9 +1,15 @@
+from typing import Dict, List, Optional, Sequence
+
 from fastapi.exceptions import HTTPException
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.crud.charity_project import charityproject_crud
-from app.models import CharityProject
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.charity_project import (CharityProjectBatchUpdate,
+                                         CharityProjectCreate)
 
 
 async def check_name_duplicate(
@@ -116,3 +122,174 @@ async def check_project_before_edit(
         elif project_full_amount == project.invested_amount:
             project.fully_invested = True
     return project
+
+
+async def check_donation_access(
+    donation_id: int,
+    user: User,
+    session: AsyncSession
+) -> Donation:
+    """
+    Проверяет, что пожертвование существует и доступно пользователю.
+
+    Args:
+        donation_id (int): Идентификатор пожертвования для проверки.
+        user (User): Текущий пользователь.
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        Donation: Найденное пожертвование.
+
+    Raises:
+        HTTPException: Если пожертвование не найдено или принадлежит
+            другому пользователю, а текущий пользователь не суперюзер.
+    """
+    donation = await donation_crud.get(donation_id, session)
+    if donation is None or (
+        donation.user_id != user.id and not user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=404,
+            detail='Пожертвование не найдено!'
+        )
+    return donation
+
+
+def check_batch_size(
+    items: Sequence
+) -> None:
+    """
+    Проверяет размер пакетного запроса.
+
+    Args:
+        items (Sequence): Объекты пакета.
+
+    Raises:
+        HTTPException: Если пакет пуст или больше `settings.batch_max_size`.
+    """
+    if not items or len(items) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                'Пакет должен содержать от 1 до '
+                f'{settings.batch_max_size} объектов'
+            )
+        )
+
+
+def raise_batch_errors(
+    errors: Dict[int, str]
+) -> None:
+    """
+    Сообщает об ошибках проверки элементов пакета.
+
+    Args:
+        errors (Dict[int, str]): Сообщения об ошибках по позициям в пакете.
+
+    Raises:
+        HTTPException: Если есть хотя бы одна ошибка.
+    """
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail=[
+                {'index': index, 'detail': message}
+                for index, message in sorted(errors.items())
+            ]
+        )
+
+
+async def check_batch_names(
+    names: Sequence[Optional[str]],
+    session: AsyncSession
+) -> Dict[int, str]:
+    """
+    Проверяет уникальность имен проектов пакета одним запросом.
+
+    Args:
+        names (Sequence[Optional[str]]): Имена по позициям в пакете;
+            None, если имя не меняется.
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        Dict[int, str]: Сообщения об ошибках по позициям в пакете.
+    """
+    existing = await charityproject_crud.get_ids_by_names(
+        [name for name in names if name is not None], session
+    )
+    errors = {}
+    seen = set()
+    for index, name in enumerate(names):
+        if name is None:
+            continue
+        if name in existing or name in seen:
+            errors[index] = 'Проект с таким именем уже существует!'
+        seen.add(name)
+    return errors
+
+
+async def check_projects_before_batch_create(
+    projects_in: List[CharityProjectCreate],
+    session: AsyncSession
+) -> None:
+    """
+    Проверяет, можно ли создать пакет проектов.
+
+    Args:
+        projects_in (List[CharityProjectCreate]): Данные проектов.
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Raises:
+        HTTPException: Если пакет пуст, слишком велик или имена
+            проектов не уникальны.
+    """
+    check_batch_size(projects_in)
+    raise_batch_errors(await check_batch_names(
+        [project_in.name for project_in in projects_in], session
+    ))
+
+
+async def check_projects_before_batch_edit(
+    projects_in: List[CharityProjectBatchUpdate],
+    session: AsyncSession
+) -> Dict[int, CharityProject]:
+    """
+    Проверяет, можно ли обновить пакет проектов.
+
+    К каждому элементу применяются те же правила, что и при обновлении
+    одного проекта.
+
+    Args:
+        projects_in (List[CharityProjectBatchUpdate]): Данные для обновления.
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        Dict[int, CharityProject]: Обновляемые проекты по ID.
+
+    Raises:
+        HTTPException: Если хотя бы один элемент пакета не проходит проверку.
+    """
+    check_batch_size(projects_in)
+    projects = await charityproject_crud.get_by_ids(
+        [project_in.id for project_in in projects_in], session
+    )
+    errors = await check_batch_names(
+        [project_in.name for project_in in projects_in], session
+    )
+    seen = set()
+    for index, project_in in enumerate(projects_in):
+        project = projects.get(project_in.id)
+        if project is None:
+            errors[index] = 'Проект не найден!'
+        elif project_in.id in seen:
+            errors[index] = 'Проект уже есть в пакете!'
+        elif project.fully_invested:
+            errors[index] = 'Закрытый проект нельзя редактировать!'
+        elif (
+            project_in.full_amount is not None
+            and project_in.full_amount < project.invested_amount
+        ):
+            errors[index] = 'Нельзя установить требуемую сумму меньше внесенной'
+        seen.add(project_in.id)
+    raise_batch_errors(errors)
+    return projects
@@ -0,0 +1,192 @@
+"""
+Служебные команды приложения.
+
+Запуск из корня проекта:
+
+    python -m app.cli import-donations donations.csv --chunk-size 5000
+    python -m app.cli replay --dry-run
+    python -m app.cli match
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.db import async_session
+from app.services.importer import (ImportFormat, import_donations,
+                                   parse_donations)
+from app.services.investment import investment, open_counts
+from app.services.replay import refresh_summary, replay
+
+
+def positive_int(value: str) -> int:
+    """
+    Разбирает аргумент командной строки как положительное целое число.
+
+    Args:
+        value (str): Значение аргумента.
+
+    Raises:
+        argparse.ArgumentTypeError: Если значение не является целым числом
+            больше нуля.
+
+    Returns:
+        int: Разобранное число.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(
+            f'ожидается целое число больше нуля, получено {value!r}'
+        )
+    return number
+
+
+def report_progress(rows: int, elapsed: float) -> None:
+    """
+    Печатает ход обработки в stderr.
+
+    Args:
+        rows (int): Количество обработанных записей.
+        elapsed (float): Время от начала в секундах.
+    """
+    rate = rows / elapsed if elapsed else 0
+    print(f'{rows} записей, {rate:.0f} записей/с', file=sys.stderr)
+
+
+async def run_import(args: argparse.Namespace) -> None:
+    """
+    Выполняет команду import-donations.
+    """
+    fmt: ImportFormat
+    if args.format:
+        fmt = args.format
+    elif args.path.endswith(('.ndjson', '.jsonl')):
+        fmt = 'ndjson'
+    else:
+        fmt = 'csv'
+    stream = (
+        sys.stdin if args.path == '-'
+        else open(args.path, encoding='utf-8', newline='')
+    )
+    try:
+        total = await import_donations(
+            async_session,
+            parse_donations(stream, fmt),
+            chunk_size=args.chunk_size,
+            match_every=args.match_every or 0,
+            progress=report_progress
+        )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f'Импортировано пожертвований: {total}')
+
+
+async def run_replay(args: argparse.Namespace) -> None:
+    """
+    Выполняет команду replay.
+    """
+    report = await replay(
+        async_session,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+        sample_size=args.show,
+        progress=report_progress
+    )
+    for difference in report.differences:
+        print(
+            f'{difference.table} {difference.obj_id}: '
+            f'{difference.current} -> {difference.replayed}'
+        )
+    print(
+        f'Обработано объектов: {report.processed}, '
+        f'распределено: {report.allocated}'
+    )
+    for table, changed in report.changed.items():
+        print(f'{table}: {"отличается" if args.dry_run else "изменено"} {changed}')
+
+
+async def run_match(args: argparse.Namespace) -> None:
+    """
+    Выполняет команду match.
+    """
+    async with async_session() as session:
+        await refresh_summary(session)
+        await investment(session)
+        open_donations, open_projects = await open_counts(session)
+    print(
+        f'Открытых пожертвований: {open_donations}, '
+        f'открытых проектов: {open_projects}'
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Создает разбор аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: Парсер аргументов.
+    """
+    parser = argparse.ArgumentParser(description='Служебные команды приложения.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser(
+        'import-donations',
+        help='импортировать пожертвования из CSV или NDJSON'
+    )
+    import_parser.add_argument(
+        'path', help='путь к файлу или "-" для чтения из stdin'
+    )
+    import_parser.add_argument(
+        '--format', choices=['csv', 'ndjson'],
+        help='формат файла; по умолчанию определяется по расширению'
+    )
+    import_parser.add_argument(
+        '--chunk-size', type=positive_int, default=1000,
+        help='количество записей в одном INSERT'
+    )
+    import_parser.add_argument(
+        '--match-every', type=positive_int,
+        help='запускать распределение каждые N порций; '
+             'по умолчанию только в конце'
+    )
+    import_parser.set_defaults(handler=run_import)
+
+    replay_parser = commands.add_parser(
+        'replay',
+        help='заново распределить средства по всей истории'
+    )
+    replay_parser.add_argument(
+        '--dry-run', action='store_true',
+        help='только показать расхождения с текущим состоянием'
+    )
+    replay_parser.add_argument(
+        '--chunk-size', type=positive_int, default=1000,
+        help='количество объектов, читаемых и записываемых за раз'
+    )
+    replay_parser.add_argument(
+        '--show', type=int, default=20,
+        help='сколько расхождений напечатать'
+    )
+    replay_parser.set_defaults(handler=run_replay)
+
+    match_parser = commands.add_parser(
+        'match',
+        help='выполнить полный проход распределения по открытым объектам'
+    )
+    match_parser.set_defaults(handler=run_match)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    try:
+        asyncio.run(args.handler(args))
+    except ValueError as error:
+        sys.exit(f'Ошибка: {error}')
+
+
+if __name__ == '__main__':
+    main()
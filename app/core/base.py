@@ -1,2 +1,3 @@
 from app.core.db import Base # noqa
-from app.models import CharityProject, Donation, User # noqa
+from app.models import (CharityProject, DataVersion, Donation, # noqa
+                        FundsSummary, Investment, User)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,11 +10,70 @@ class Settings(BaseSettings):
     Attributes:
         database_url (str): URL базы данных.
         secret (str): Секретный ключ для JWT.
+        investment_engine (str): Механизм распределения средств: 'python'
+                                 (цикл по объектам) или 'sql' (расчет
+                                 нарастающими итогами в базе данных).
+        investment_strategy (str): Стратегия сопоставления: 'fifo'
+                                   (в порядке создания),
+                                   'smallest_remaining' (первыми проекты
+                                   с наименьшей недостающей суммой) или
+                                   'proportional' (каждое пожертвование
+                                   делится между всеми открытыми проектами
+                                   пропорционально недостающим суммам).
+                                   Стратегия 'proportional' всегда
+                                   выполняется механизмом 'python'
+                                   и стоит O(P) на каждое пожертвование
+                                   при P открытых проектах: при 1000
+                                   проектах полный проход по 10000
+                                   пожертвований держит блокировку
+                                   записи до 3-4 с.
+        investment_chunk_size (int): Размер порции, которой читаются
+                                     очереди открытых объектов при полном
+                                     проходе.
+        investment_deferred (bool): Выполнять распределение в фоновом
+                                    обработчике, а не при создании объекта.
+        investment_window (float): Окно в секундах, в пределах которого
+                                   сигналы фонового обработчика
+                                   объединяются в один проход.
+        investment_retry_delay (float): Пауза в секундах перед повтором
+                                        прохода фонового обработчика,
+                                        завершившегося ошибкой; удваивается
+                                        после каждой следующей ошибки.
+        investment_retry_max_delay (float): Наибольшая пауза перед
+                                            повтором прохода.
+        batch_max_size (int): Наибольшее количество объектов в одном
+                              пакетном запросе.
+        export_chunk_size (int): Размер порции, которой строки читаются
+                                 при выгрузке.
+        page_size (int): Размер страницы списков по умолчанию.
+        page_size_max (int): Наибольший размер страницы списков.
+        response_cache_size (int): Наибольшее количество готовых ответов
+                                   списка проектов, хранимых в кэше.
+        response_cache_gzip (bool): Отдавать из кэша сжатые gzip ответы
+                                    клиентам, которые их принимают.
+        preview_cache_size (int): Наибольшее количество прогнозов
+                                  распределения, хранимых в кэше.
         model_config (SettingsConfigDict): Конфигурация модели, указывающая файл
                                            переменных окружения и его кодировку.
     """
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
     secret: str = 'SECRET'
+    investment_engine: Literal['python', 'sql'] = 'python'
+    investment_strategy: Literal[
+        'fifo', 'smallest_remaining', 'proportional'
+    ] = 'fifo'
+    investment_chunk_size: int = 1000
+    investment_deferred: bool = False
+    investment_window: float = 0.05
+    investment_retry_delay: float = 1.0
+    investment_retry_max_delay: float = 60.0
+    batch_max_size: int = 10000
+    export_chunk_size: int = 1000
+    page_size: int = 100
+    page_size_max: int = 1000
+    response_cache_size: int = 64
+    response_cache_gzip: bool = True
+    preview_cache_size: int = 256
     model_config = SettingsConfigDict(
         env_file='.env', env_file_encoding='utf-8'
     )
@@ -1,4 +1,11 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, ClassVar
+
+from sqlalchemy import Table, func, select
+from sqlalchemy.ext.asyncio import (AsyncSession, create_async_engine,
+                                    async_sessionmaker)
 from sqlalchemy.orm import (DeclarativeBase, Mapped, mapped_column,
                             declared_attr)
 
@@ -14,6 +21,10 @@ class Base(DeclarativeBase):
     """
     id: Mapped[int] = mapped_column(primary_key=True)
 
+    if TYPE_CHECKING:
+        # Модели отображаются на таблицы, а не на произвольные выборки.
+        __table__: ClassVar[Table]
+
     @declared_attr.directive
     def __tablename__(cls):
         """
@@ -36,3 +47,57 @@ async def get_async_session():
     """
     async with async_session() as session:
         yield session
+
+
+WRITER_LOCK_KEY = 0x6361745f66756e64
+
+_writer_locks: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, asyncio.Lock
+] = weakref.WeakKeyDictionary()
+
+
+def writer_lock() -> asyncio.Lock:
+    """
+    Возвращает блокировку записи для текущего цикла событий.
+
+    Блокировка asyncio привязывается к циклу событий, поэтому для каждого
+    цикла создается своя.
+
+    Returns:
+        asyncio.Lock: Блокировка записи.
+    """
+    loop = asyncio.get_running_loop()
+    lock = _writer_locks.get(loop)
+    if lock is None:
+        lock = _writer_locks[loop] = asyncio.Lock()
+    return lock
+
+
+@asynccontextmanager
+async def single_writer(session: AsyncSession):
+    """
+    Асинхронный контекстный менеджер единственного писателя.
+
+    Внутри процесса пишущие транзакции выстраиваются в очередь
+    на блокировке asyncio. Между процессами право записи берется
+    в базе данных в начале транзакции: в SQLite через BEGIN IMMEDIATE,
+    чтобы блокировка не повышалась после чтения, а в PostgreSQL через
+    транзакционную advisory-блокировку. Транзакция должна быть
+    зафиксирована или отменена внутри контекста.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+    """
+    async with writer_lock():
+        connection = await session.connection()
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            if driver_connection is None or not driver_connection.in_transaction:
+                await connection.exec_driver_sql('BEGIN IMMEDIATE')
+        elif dialect == 'postgresql':
+            await connection.execute(
+                select(func.pg_advisory_xact_lock(WRITER_LOCK_KEY))
+            )
+        yield
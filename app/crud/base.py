@@ -1,14 +1,15 @@
-from typing import TypeVar, Generic, Type, Optional, Sequence
+from typing import Any, TypeVar, Generic, Type, Optional, Mapping, Sequence
 
 from fastapi.encoders import jsonable_encoder
 
-from sqlalchemy import select
+from sqlalchemy import Row, literal, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from pydantic import BaseModel
 
-from app.core.db import Base
+from app.core.db import Base, single_writer
 from app.models import User
+from app.models.version import version_bump
 
 ModelType = TypeVar('ModelType', bound=Base)
 CreateSchemaType = TypeVar('CreateSchemaType', bound=BaseModel)
@@ -49,20 +50,80 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     async def get_multi(
             self,
-            session: AsyncSession
+            session: AsyncSession,
+            after_id: Optional[int] = None,
+            limit: Optional[int] = None
     ) -> Sequence[ModelType]:
         """
-        Получает все объекты.
+        Получает объекты в порядке ID.
 
         Args:
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            after_id (Optional[int]): Вернуть только объекты с ID больше
+                указанного.
+            limit (Optional[int]): Наибольшее количество объектов;
+                None - все объекты.
 
         Returns:
             Sequence[ModelType]: Список объектов.
         """
-        db_objs = await session.scalars(select(self.model))
+        query = select(self.model).order_by(self.model.id).limit(limit)
+        if after_id is not None:
+            query = query.where(self.model.id > after_id)
+        db_objs = await session.scalars(query)
         return db_objs.all()
 
+    async def get_multi_rows(
+            self,
+            session: AsyncSession,
+            fields: Sequence[str],
+            after: Optional[Sequence[Any]] = None,
+            limit: Optional[int] = None,
+            order_by: Sequence[str] = (),
+            filters: Optional[Mapping[str, Any]] = None
+    ) -> Sequence[Row]:
+        """
+        Получает объекты как строки выборки, без создания объектов ORM.
+
+        Объекты упорядочиваются по колонкам `order_by`, а затем по ID.
+        Колонки этого ключа, которых нет в `fields`, добавляются в конец
+        строки, чтобы по последней строке можно было построить курсор.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            fields (Sequence[str]): Имена колонок в порядке выборки.
+            after (Optional[Sequence[Any]]): Значения ключа сортировки,
+                после которых начинается выборка.
+            limit (Optional[int]): Наибольшее количество объектов;
+                None - все объекты.
+            order_by (Sequence[str]): Колонки сортировки перед ID.
+            filters (Optional[Mapping[str, Any]]): Значения колонок,
+                которым должны быть равны объекты.
+
+        Returns:
+            Sequence[Row]: Строки с колонками `fields` и колонками ключа.
+        """
+        table = self.model.__table__
+        key = [table.c[name] for name in (*order_by, 'id')]
+        columns = [table.c[name] for name in fields]
+        columns += [column for column in key if column.name not in fields]
+        query = (
+            select(*columns)
+            .where(*(
+                table.c[name] == value
+                for name, value in (filters or {}).items()
+            ))
+            .order_by(*key)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(tuple_(*key) > tuple_(*(
+                literal(value, column.type)
+                for value, column in zip(after, key)
+            )))
+        rows = await session.execute(query)
+        return rows.all()
+
     async def create(
             self,
             obj_in: CreateSchemaType,
@@ -84,8 +145,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if user is not None:
             obj_in_data['user_id'] = user.id
         db_obj = self.model(**obj_in_data)
-        session.add(db_obj)
-        await session.commit()
+        async with single_writer(session):
+            session.add(db_obj)
+            await session.execute(version_bump(self.model))
+            await session.commit()
         await session.refresh(db_obj)
         return db_obj
 
@@ -111,8 +174,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         for field in db_obj_data:
             if field in obj_in_data:
                 setattr(db_obj, field, obj_in_data[field])
-        session.add(db_obj)
-        await session.commit()
+        async with single_writer(session):
+            session.add(db_obj)
+            await session.execute(version_bump(self.model))
+            await session.commit()
         await session.refresh(db_obj)
         return db_obj
 
@@ -131,6 +196,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             ModelType: Удаленный объект.
         """
-        await session.delete(db_obj)
-        await session.commit()
+        async with single_writer(session):
+            await session.delete(db_obj)
+            await session.execute(version_bump(self.model))
+            await session.commit()
         return db_obj
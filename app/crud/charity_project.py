@@ -1,13 +1,18 @@
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
+from app.core.db import single_writer
 from app.models import CharityProject, User
-from app.schemas.charity_project import (CharityProjectCreate,
+from app.models.version import version_bump
+from app.schemas.charity_project import (CharityProjectBatchUpdate,
+                                        CharityProjectCreate,
                                         CharityProjectUpdate)
+from app.core.config import settings
 from app.services.investment import investment
+from app.services.worker import investment_worker
 
 
 class CRUDCharityProject(CRUDBase[
@@ -28,6 +33,9 @@ class CRUDCharityProject(CRUDBase[
         """
         Создает новый благотворительный проект и запускает инвестиционный процесс.
 
+        В отложенном режиме распределение только запрашивается у фонового
+        обработчика.
+
         Args:
             obj_in (CharityProjectCreate): Данные для создания проекта.
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
@@ -37,7 +45,10 @@ class CRUDCharityProject(CRUDBase[
             CharityProject: Созданный проект.
         """
         project = await super().create(obj_in, session)
-        await investment(session)
+        if settings.investment_deferred:
+            investment_worker.signal()
+            return project
+        await investment(session, project)
         await session.refresh(project)
         return project
 
@@ -61,5 +72,132 @@ class CRUDCharityProject(CRUDBase[
         )
         return project_id
 
+    async def get_ids_by_names(
+        self,
+        names: Sequence[str],
+        session: AsyncSession
+    ) -> Dict[str, int]:
+        """
+        Получает ID проектов по именам одним запросом.
+
+        Args:
+            names (Sequence[str]): Имена проектов.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            Dict[str, int]: ID найденных проектов по именам.
+        """
+        rows = await session.execute(
+            select(CharityProject.name, CharityProject.id)
+            .where(CharityProject.name.in_(names))
+        )
+        return dict(rows.tuples().all())
+
+    async def get_by_ids(
+        self,
+        ids: Sequence[int],
+        session: AsyncSession
+    ) -> Dict[int, CharityProject]:
+        """
+        Получает проекты по ID одним запросом.
+
+        Args:
+            ids (Sequence[int]): ID проектов.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            Dict[int, CharityProject]: Найденные проекты по ID.
+        """
+        projects = await session.scalars(
+            select(CharityProject)
+            .where(CharityProject.id.in_(ids))
+            .execution_options(populate_existing=True)
+        )
+        return {project.id: project for project in projects}
+
+    async def create_batch(
+        self,
+        objs_in: List[CharityProjectCreate],
+        session: AsyncSession
+    ) -> List[CharityProject]:
+        """
+        Создает пакет проектов в одной транзакции и запускает один проход
+        распределения.
+
+        Args:
+            objs_in (List[CharityProjectCreate]): Данные проектов.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            List[CharityProject]: Созданные проекты в порядке пакета.
+        """
+        projects = [CharityProject(**obj_in.model_dump()) for obj_in in objs_in]
+        async with single_writer(session):
+            session.add_all(projects)
+            await session.flush()
+            ids = [project.id for project in projects]
+            await session.execute(version_bump(CharityProject))
+            await session.commit()
+        return await self.invest_batch(ids, session)
+
+    async def update_batch(
+        self,
+        objs_in: List[CharityProjectBatchUpdate],
+        projects: Dict[int, CharityProject],
+        session: AsyncSession
+    ) -> List[CharityProject]:
+        """
+        Обновляет пакет проектов в одной транзакции и запускает один проход
+        распределения.
+
+        Проект, требуемая сумма которого становится равной вложенной,
+        закрывается.
+
+        Args:
+            objs_in (List[CharityProjectBatchUpdate]): Данные для обновления.
+            projects (Dict[int, CharityProject]): Обновляемые проекты по ID.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            List[CharityProject]: Обновленные проекты в порядке пакета.
+        """
+        for obj_in in objs_in:
+            project = projects[obj_in.id]
+            for field, value in obj_in.model_dump(
+                exclude_unset=True, exclude={'id'}
+            ).items():
+                setattr(project, field, value)
+            if project.full_amount == project.invested_amount:
+                project.fully_invested = True
+        async with single_writer(session):
+            await session.execute(version_bump(CharityProject))
+            await session.commit()
+        return await self.invest_batch(
+            [obj_in.id for obj_in in objs_in], session
+        )
+
+    async def invest_batch(
+        self,
+        ids: List[int],
+        session: AsyncSession
+    ) -> List[CharityProject]:
+        """
+        Запускает один проход распределения после пакетной операции
+        и перечитывает проекты пакета.
+
+        Args:
+            ids (List[int]): ID проектов в порядке пакета.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            List[CharityProject]: Проекты в порядке пакета.
+        """
+        if settings.investment_deferred:
+            investment_worker.signal()
+        else:
+            await investment(session)
+        projects = await self.get_by_ids(ids, session)
+        return [projects[project_id] for project_id in ids]
+
 
 charityproject_crud = CRUDCharityProject(CharityProject)
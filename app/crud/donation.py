@@ -1,14 +1,21 @@
-from typing import Optional, Sequence
+import datetime as dt
+from typing import List, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from pydantic import BaseModel
 
 from app.crud.base import CRUDBase
+from app.core.db import single_writer
 from app.models import Donation, User
+from app.models.summary import summary_delta
+from app.models.version import version_bump
 from app.schemas.donation import DonationCreate
+from app.core.config import settings
+from app.services.donation_index import donation_index
 from app.services.investment import investment
+from app.services.worker import investment_worker
 
 
 class CRUDDonation(CRUDBase[
@@ -29,6 +36,10 @@ class CRUDDonation(CRUDBase[
         """
         Создает новое пожертвование и запускает инвестиционный процесс.
 
+        Пожертвование добавляется в индекс открытых пожертвований.
+        В отложенном режиме распределение только запрашивается у фонового
+        обработчика.
+
         Args:
             obj_in (DonationCreate): Данные для создания пожертвования.
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
@@ -38,29 +49,114 @@ class CRUDDonation(CRUDBase[
             Donation: Созданное пожертвование.
         """
         donation = await super().create(obj_in, session, user)
-        await investment(session)
+        donation_index.append(
+            donation.id, donation.create_date, donation.full_amount
+        )
+        if settings.investment_deferred:
+            investment_worker.signal()
+            return donation
+        await investment(session, donation)
         await session.refresh(donation)
         return donation
 
+    async def create_batch(
+            self,
+            objs_in: List[DonationCreate],
+            session: AsyncSession,
+            user: User
+    ) -> Sequence[Row]:
+        """
+        Создает пакет пожертвований и запускает один проход распределения.
+
+        Пожертвования добавляются одним пакетным INSERT в одной транзакции
+        и получают общую дату создания, поэтому в очереди они следуют
+        в порядке пакета. Пакетная вставка не вызывает событий ORM,
+        поэтому сводка открытых средств обновляется явно.
+
+        Args:
+            objs_in (List[DonationCreate]): Данные пожертвований.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            user (User): Пользователь, создающий пожертвования.
+
+        Returns:
+            Sequence[Row]: ID и состояние пожертвований в порядке пакета.
+        """
+        now = dt.datetime.now()
+        rows = [
+            {
+                **obj_in.model_dump(),
+                'user_id': user.id,
+                'invested_amount': 0,
+                'fully_invested': False,
+                'create_date': now,
+            }
+            for obj_in in objs_in
+        ]
+        async with single_writer(session):
+            ids = (await session.scalars(
+                insert(Donation.__table__).returning(
+                    Donation.id, sort_by_parameter_order=True
+                ),
+                rows
+            )).all()
+            await session.execute(summary_delta(
+                Donation, len(rows), sum(row['full_amount'] for row in rows)
+            ))
+            await session.execute(version_bump(Donation))
+            await session.commit()
+        for obj_id, row in zip(ids, rows):
+            donation_index.append(obj_id, now, row['full_amount'])
+        if settings.investment_deferred:
+            investment_worker.signal()
+        else:
+            await investment(session)
+        statuses = {
+            row.id: row for row in await session.execute(
+                select(
+                    Donation.id, Donation.invested_amount,
+                    Donation.fully_invested
+                ).where(Donation.id.in_(ids))
+            )
+        }
+        return [statuses[obj_id] for obj_id in ids]
+
     async def get_by_user(
         self,
         session: AsyncSession,
-        user: User
-    ) -> Sequence[Donation]:
+        user: User,
+        fields: Sequence[str],
+        after: Optional[Sequence[int]] = None,
+        limit: Optional[int] = None,
+        fully_invested: Optional[bool] = None
+    ) -> Sequence[Row]:
         """
-        Получает все пожертвования, сделанные пользователем.
+        Получает пожертвования, сделанные пользователем, в порядке ID
+        как строки выборки.
+
+        Выборка идет по индексу (user_id, id), поэтому страница читается
+        без просмотра чужих пожертвований и без сортировки.
 
         Args:
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
             user (User): Пользователь, чьи пожертвования нужно получить.
+            fields (Sequence[str]): Имена колонок в порядке выборки.
+            after (Optional[Sequence[int]]): Ключ (ID,), после которого
+                начинается выборка.
+            limit (Optional[int]): Наибольшее количество пожертвований;
+                None - все пожертвования.
+            fully_invested (Optional[bool]): Вернуть только закрытые (True)
+                или только открытые (False) пожертвования; None - все.
 
         Returns:
-            Sequence[Donation]: Список пожертвований.
+            Sequence[Row]: Строки с колонками `fields`.
         """
-        donations = await session.scalars(
-            select(Donation).where(Donation.user_id == user.id)
+        filters = {'user_id': user.id}
+        if fully_invested is not None:
+            filters['fully_invested'] = fully_invested
+        rows = await self.get_multi_rows(
+            session, fields, after, limit, filters=filters
         )
-        return donations.all()
+        return rows
 
 
 donation_crud = CRUDDonation(Donation)
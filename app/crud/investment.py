@@ -0,0 +1,66 @@
+from typing import Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pydantic import BaseModel
+
+from app.crud.base import CRUDBase
+from app.models import Investment
+
+
+class CRUDInvestment(CRUDBase[
+    Investment,
+    BaseModel,
+    BaseModel
+]):
+    """
+    Класс для чтения журнала распределения средств.
+    """
+
+    async def get_by_project(
+        self,
+        project_id: int,
+        session: AsyncSession
+    ) -> Sequence[Investment]:
+        """
+        Получает все поступления в проект.
+
+        Args:
+            project_id (int): ID проекта.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            Sequence[Investment]: Записи журнала в порядке распределения.
+        """
+        investments = await session.scalars(
+            select(Investment)
+            .where(Investment.project_id == project_id)
+            .order_by(Investment.id)
+        )
+        return investments.all()
+
+    async def get_by_donation(
+        self,
+        donation_id: int,
+        session: AsyncSession
+    ) -> Sequence[Investment]:
+        """
+        Получает все вложения из пожертвования.
+
+        Args:
+            donation_id (int): ID пожертвования.
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+        Returns:
+            Sequence[Investment]: Записи журнала в порядке распределения.
+        """
+        investments = await session.scalars(
+            select(Investment)
+            .where(Investment.donation_id == donation_id)
+            .order_by(Investment.id)
+        )
+        return investments.all()
+
+
+investment_crud = CRUDInvestment(Investment)
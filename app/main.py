@@ -1,7 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api.routers import main_router
+from app.services.worker import investment_worker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Запускает фоновый обработчик распределения средств на время работы
+    приложения.
+    """
+    await investment_worker.start()
+    yield
+    await investment_worker.stop()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(main_router)
@@ -1,3 +1,6 @@
 from .charity_project import CharityProject # noqa
 from .donation import Donation # noqa
+from .investment import Investment # noqa
+from .summary import FundsSummary # noqa
 from .user import User # noqa
+from .version import DataVersion # noqa
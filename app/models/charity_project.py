@@ -1,7 +1,7 @@
 import datetime as dt
 
 from sqlalchemy import (String, Text, Boolean, Integer, DateTime,
-                        CheckConstraint)
+                        CheckConstraint, Computed, Index, text)
 from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from app.core.db import Base
@@ -19,6 +19,9 @@ class CharityProject(Base):
         fully_invested (Mapped[bool]): Флаг, указывающий, полностью ли профинансирован проект.
         create_date (Mapped[dt.datetime]): Дата создания проекта.
         close_date (Mapped[dt.datetime]): Дата закрытия проекта (если применимо).
+        remaining_amount (Mapped[int]): Недостающая сумма проекта. Колонка
+            вычисляется базой данных и хранится, чтобы по ней можно было
+            строить индекс.
     """
     name: Mapped[str] = mapped_column(String(100), unique=True)
     description: Mapped[str] = mapped_column(Text)
@@ -29,12 +32,27 @@ class CharityProject(Base):
         DateTime, default=dt.datetime.now
     )
     close_date: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True)
+    remaining_amount: Mapped[int] = mapped_column(
+        Integer, Computed('full_amount - invested_amount', persisted=True),
+        nullable=True
+    )
 
     __table_args__ = (
         CheckConstraint(full_amount > 0, name='check_full_amount_positive'),
         CheckConstraint(
             invested_amount >= 0, name='check_invested_amount_positive'
         ),
+        Index(
+            'ix_charityproject_open_queue', 'create_date', 'id',
+            sqlite_where=text('fully_invested = 0'),
+            postgresql_where=text('fully_invested = false')
+        ),
+        Index(
+            'ix_charityproject_open_remaining',
+            'remaining_amount', 'create_date', 'id',
+            sqlite_where=text('fully_invested = 0'),
+            postgresql_where=text('fully_invested = false')
+        ),
     )
 
     @validates('fully_invested')
@@ -1,7 +1,7 @@
 import datetime as dt
 
 from sqlalchemy import (ForeignKey, Text, Integer, Boolean, DateTime,
-                        CheckConstraint)
+                        CheckConstraint, Index, text)
 from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from app.core.db import Base
@@ -35,6 +35,12 @@ class Donation(Base):
         CheckConstraint(
             invested_amount >= 0, name='check_invested_amount_positive'
         ),
+        Index(
+            'ix_donation_open_queue', 'create_date', 'id',
+            sqlite_where=text('fully_invested = 0'),
+            postgresql_where=text('fully_invested = false')
+        ),
+        Index('ix_donation_user_id', 'user_id', 'id'),
     )
 
     @validates('fully_invested')
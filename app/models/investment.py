@@ -0,0 +1,32 @@
+import datetime as dt
+
+from sqlalchemy import ForeignKey, Integer, DateTime, CheckConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    """
+    Модель записи журнала распределения средств.
+
+    Attributes:
+        donation_id (Mapped[int]): ID пожертвования, из которого взяты средства.
+        project_id (Mapped[int]): ID проекта, получившего средства.
+        amount (Mapped[int]): Переведенная сумма.
+        created_at (Mapped[dt.datetime]): Дата распределения.
+    """
+    donation_id: Mapped[int] = mapped_column(
+        ForeignKey('donation.id'), index=True
+    )
+    project_id: Mapped[int] = mapped_column(
+        ForeignKey('charityproject.id'), index=True
+    )
+    amount: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[dt.datetime] = mapped_column(
+        DateTime, default=dt.datetime.now
+    )
+
+    __table_args__ = (
+        CheckConstraint(amount > 0, name='check_amount_positive'),
+    )
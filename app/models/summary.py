@@ -0,0 +1,147 @@
+from typing import Tuple, Union
+
+from sqlalchemy import DDL, Integer, Update, event, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapped, Mapper, mapped_column
+from sqlalchemy.orm.attributes import get_history
+
+from app.core.db import Base
+from app.models.charity_project import CharityProject
+from app.models.donation import Donation
+
+SUMMARY_ID = 1
+
+
+class FundsSummary(Base):
+    """
+    Модель сводки по открытым средствам. Таблица содержит одну строку.
+
+    Attributes:
+        open_donations (Mapped[int]): Количество открытых пожертвований.
+        open_donation_amount (Mapped[int]): Свободный остаток открытых
+            пожертвований.
+        open_projects (Mapped[int]): Количество открытых проектов.
+        open_project_amount (Mapped[int]): Недостающая сумма открытых проектов.
+        version (Mapped[int]): Версия очередей открытых объектов.
+            Увеличивается при каждом изменении сводки.
+    """
+    open_donations: Mapped[int] = mapped_column(Integer, default=0)
+    open_donation_amount: Mapped[int] = mapped_column(Integer, default=0)
+    open_projects: Mapped[int] = mapped_column(Integer, default=0)
+    open_project_amount: Mapped[int] = mapped_column(Integer, default=0)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+event.listen(
+    FundsSummary.__table__,
+    'after_create',
+    DDL(
+        f'INSERT INTO fundssummary (id, open_donations, open_donation_amount, '
+        f'open_projects, open_project_amount, version) '
+        f'VALUES ({SUMMARY_ID}, 0, 0, 0, 0, 0)'
+    )
+)
+
+
+def summary_delta(
+        model: type,
+        count: int,
+        amount: int
+) -> Update:
+    """
+    Формирует UPDATE, изменяющий сводку на заданную величину
+    и увеличивающий версию очередей.
+
+    Args:
+        model (type): Модель, к стороне которой относится изменение.
+        count (int): Изменение количества открытых объектов.
+        amount (int): Изменение суммы остатков открытых объектов.
+
+    Returns:
+        Update: Запрос изменения сводки.
+    """
+    table = FundsSummary.__table__
+    if model is Donation:
+        count_column, amount_column = 'open_donations', 'open_donation_amount'
+    else:
+        count_column, amount_column = 'open_projects', 'open_project_amount'
+    return update(table).where(table.c.id == SUMMARY_ID).values({
+        count_column: table.c[count_column] + count,
+        amount_column: table.c[amount_column] + amount,
+        'version': table.c.version + 1,
+    })
+
+
+def open_balance(
+        target: Union[CharityProject, Donation],
+        previous: bool = False
+) -> Tuple[int, int]:
+    """
+    Возвращает вклад объекта в сводку: (открыт ли он, его остаток).
+
+    Args:
+        target (Union[CharityProject, Donation]): Проект или пожертвование.
+        previous (bool): Взять значения до изменения, еще не записанного
+            в базу данных.
+
+    Returns:
+        Tuple[int, int]: Количество (0 или 1) и остаток.
+    """
+    values = {}
+    for key in ('full_amount', 'invested_amount', 'fully_invested'):
+        history = get_history(target, key)
+        if previous and history.deleted:
+            values[key] = history.deleted[0]
+        else:
+            values[key] = getattr(target, key)
+    if values['fully_invested']:
+        return 0, 0
+    return 1, values['full_amount'] - values['invested_amount']
+
+
+def after_insert(
+        mapper: Mapper,
+        connection: Connection,
+        target: Union[CharityProject, Donation]
+) -> None:
+    """
+    Учитывает в сводке новый объект.
+    """
+    count, amount = open_balance(target)
+    if count:
+        connection.execute(summary_delta(type(target), count, amount))
+
+
+def after_update(
+        mapper: Mapper,
+        connection: Connection,
+        target: Union[CharityProject, Donation]
+) -> None:
+    """
+    Учитывает в сводке изменение объекта.
+    """
+    count, amount = open_balance(target)
+    previous_count, previous_amount = open_balance(target, previous=True)
+    if (count, amount) != (previous_count, previous_amount):
+        connection.execute(summary_delta(
+            type(target), count - previous_count, amount - previous_amount
+        ))
+
+
+def after_delete(
+        mapper: Mapper,
+        connection: Connection,
+        target: Union[CharityProject, Donation]
+) -> None:
+    """
+    Исключает из сводки удаленный объект.
+    """
+    count, amount = open_balance(target)
+    if count:
+        connection.execute(summary_delta(type(target), -count, -amount))
+
+
+for model in (CharityProject, Donation):
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_update', after_update)
+    event.listen(model, 'after_delete', after_delete)
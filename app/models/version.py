@@ -0,0 +1,58 @@
+from typing import Type
+
+from sqlalchemy import DDL, Integer, String, Update, event, update
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+from app.models.charity_project import CharityProject
+from app.models.donation import Donation
+
+VERSIONED_TABLES = (CharityProject.__tablename__, Donation.__tablename__)
+
+
+class DataVersion(Base):
+    """
+    Модель версии данных таблицы.
+
+    Версия увеличивается в той же транзакции, что и запись в таблицу,
+    поэтому по ней можно проверить, изменились ли данные, не читая их.
+
+    Attributes:
+        table_name (Mapped[str]): Имя таблицы.
+        version (Mapped[int]): Версия данных таблицы.
+    """
+    table_name: Mapped[str] = mapped_column(String(100), unique=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+event.listen(
+    DataVersion.__table__,
+    'after_create',
+    DDL(
+        'INSERT INTO dataversion (table_name, version) VALUES ' + ', '.join(
+            f"('{table_name}', 0)" for table_name in VERSIONED_TABLES
+        )
+    )
+)
+
+
+def version_bump(
+        *models: Type[Base]
+) -> Update:
+    """
+    Формирует UPDATE, увеличивающий версии данных таблиц моделей.
+
+    Args:
+        *models (Type[Base]): Модели, в таблицы которых выполнена
+            запись.
+
+    Returns:
+        Update: Запрос изменения версий.
+    """
+    return (
+        update(DataVersion)
+        .where(DataVersion.table_name.in_(
+            [model.__tablename__ for model in models]
+        ))
+        .values(version=DataVersion.version + 1)
+    )
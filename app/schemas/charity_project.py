@@ -40,6 +40,16 @@ class CharityProjectUpdate(CharityProjectBase):
     pass
 
 
+class CharityProjectBatchUpdate(CharityProjectUpdate):
+    """
+    Модель для обновления проекта в составе пакета.
+
+    Attributes:
+        id (int): Идентификатор обновляемого проекта.
+    """
+    id: int
+
+
 class CharityProjectCreate(CharityProjectBase):
     """
     Модель для создания благотворительного проекта.
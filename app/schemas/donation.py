@@ -30,6 +30,19 @@ class DonationCreate(DonationBase):
     pass
 
 
+class DonationImport(DonationBase):
+    """
+    Модель пожертвования, импортируемого с прежней платформы.
+
+    Attributes:
+        user_id (int): ID пользователя, сделавшего пожертвование.
+        create_date (Optional[dt.datetime]): Дата создания пожертвования;
+            если не указана, используется дата импорта.
+    """
+    user_id: int
+    create_date: Optional[dt.datetime] = None
+
+
 class DonationDBShort(DonationBase):
     """
     Короткая модель пожертвования в базе данных.
@@ -60,3 +73,17 @@ class DonationDB(DonationDBShort):
     invested_amount: int
     fully_invested: bool
     close_date: Optional[dt.datetime]
+
+
+class DonationStatus(BaseModel):
+    """
+    Модель состояния пожертвования после распределения средств.
+
+    Attributes:
+        id (int): Идентификатор пожертвования.
+        invested_amount (int): Сумма, вложенная из пожертвования.
+        fully_invested (bool): Флаг, указывающий, полностью ли вложено пожертвование.
+    """
+    id: int
+    invested_amount: int
+    fully_invested: bool
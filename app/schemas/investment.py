@@ -0,0 +1,21 @@
+import datetime as dt
+
+from pydantic import BaseModel
+
+
+class InvestmentDB(BaseModel):
+    """
+    Модель записи журнала распределения средств.
+
+    Attributes:
+        id (int): Идентификатор записи.
+        donation_id (int): ID пожертвования, из которого взяты средства.
+        project_id (int): ID проекта, получившего средства.
+        amount (int): Переведенная сумма.
+        created_at (dt.datetime): Дата распределения.
+    """
+    id: int
+    donation_id: int
+    project_id: int
+    amount: int
+    created_at: dt.datetime
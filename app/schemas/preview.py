@@ -0,0 +1,56 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class DonationShare(BaseModel):
+    """
+    Модель суммы, которую проект получил бы из пожертвования.
+
+    Attributes:
+        donation_id (int): ID пожертвования.
+        amount (int): Сумма.
+    """
+    donation_id: int
+    amount: int
+
+
+class ProjectShare(BaseModel):
+    """
+    Модель суммы, которую пожертвование вложило бы в проект.
+
+    Attributes:
+        project_id (int): ID проекта.
+        amount (int): Сумма.
+    """
+    project_id: int
+    amount: int
+
+
+class CharityProjectPreview(BaseModel):
+    """
+    Модель прогноза финансирования нового проекта.
+
+    Attributes:
+        invested_amount (int): Сумма, которая была бы вложена сразу.
+        fully_invested (bool): Был бы проект профинансирован сразу.
+        donations (List[DonationShare]): Пожертвования, которые были бы
+            израсходованы.
+    """
+    invested_amount: int
+    fully_invested: bool
+    donations: List[DonationShare]
+
+
+class DonationPreview(BaseModel):
+    """
+    Модель прогноза распределения нового пожертвования.
+
+    Attributes:
+        invested_amount (int): Сумма, которая была бы вложена сразу.
+        fully_invested (bool): Было бы пожертвование распределено целиком.
+        projects (List[ProjectShare]): Проекты, которые получили бы средства.
+    """
+    invested_amount: int
+    fully_invested: bool
+    projects: List[ProjectShare]
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+
+
+class FundsSummaryDB(BaseModel):
+    """
+    Модель сводки по открытым средствам.
+
+    Attributes:
+        open_donations (int): Количество открытых пожертвований.
+        open_donation_amount (int): Свободный остаток открытых пожертвований.
+        open_projects (int): Количество открытых проектов.
+        open_project_amount (int): Недостающая сумма открытых проектов.
+    """
+    open_donations: int
+    open_donation_amount: int
+    open_projects: int
+    open_project_amount: int
+
+
+class ResponseCacheStats(BaseModel):
+    """
+    Модель счетчиков кэша готовых ответов.
+
+    Attributes:
+        hits (int): Количество ответов, взятых из кэша.
+        misses (int): Количество ответов, построенных заново.
+        evictions (int): Количество вытесненных ответов.
+        size (int): Количество хранимых ответов.
+        max_size (int): Наибольшее количество хранимых ответов.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
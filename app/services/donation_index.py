@@ -0,0 +1,255 @@
+import datetime as dt
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import false, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Donation, FundsSummary
+from app.models.summary import SUMMARY_ID
+
+
+class StaleIndex(Exception):
+    """
+    Индекс разошелся с содержимым базы данных.
+    """
+
+
+class Cut(NamedTuple):
+    """
+    Граница префикса очереди пожертвований, покрывающего потребность.
+
+    Attributes:
+        closed (int): Количество пожертвований, вложенных полностью.
+        last_closed (Optional[Tuple[dt.datetime, int]]): Ключ FIFO
+            (дата создания, ID) последнего полностью вложенного пожертвования.
+        partial_id (Optional[int]): ID пожертвования, вложенного частично.
+        partial_amount (int): Сумма, взятая из частично вложенного
+            пожертвования.
+        allocated (int): Вся распределенная сумма.
+    """
+    closed: int
+    last_closed: Optional[Tuple[dt.datetime, int]]
+    partial_id: Optional[int]
+    partial_amount: int
+    allocated: int
+
+
+class DonationIndex:
+    """
+    Индекс нарастающих остатков открытых пожертвований в порядке FIFO.
+
+    Очередь хранится как массив нарастающих итогов остатков. Пожертвования
+    расходуются только с начала очереди, поэтому погашенный префикс
+    отмечается указателем начала и счетчиком израсходованной суммы,
+    а граница префикса, покрывающего потребность проекта, находится
+    двоичным поиском за O(log n).
+
+    Индекс живет в памяти процесса. Перед использованием он сверяется
+    со сводкой открытых средств и при расхождении перестраивается
+    из таблицы пожертвований.
+
+    Attributes:
+        ids (array): ID пожертвований в порядке очереди.
+        create_dates (List[dt.datetime]): Даты создания пожертвований.
+        cumulative (array): Нарастающие итоги остатков.
+        head (int): Позиция первого открытого пожертвования.
+        consumed (int): Сумма, израсходованная с начала очереди.
+        valid (bool): Отражает ли индекс состояние базы данных.
+    """
+
+    def __init__(self):
+        self.reset()
+        self.valid = False
+
+    def reset(
+            self,
+            rows: Iterable[Tuple[int, dt.datetime, int]] = ()
+    ) -> None:
+        """
+        Заполняет индекс заново.
+
+        Args:
+            rows (Iterable[Tuple[int, dt.datetime, int]]): Тройки
+                (ID, дата создания, остаток) открытых пожертвований
+                в порядке очереди.
+        """
+        self.ids = array('q')
+        self.create_dates: List[dt.datetime] = []
+        self.cumulative = array('q')
+        self.head = 0
+        self.consumed = 0
+        self.valid = True
+        for obj_id, create_date, amount in rows:
+            self.ids.append(obj_id)
+            self.create_dates.append(create_date)
+            self.cumulative.append(self.total + amount)
+
+    @property
+    def total(self) -> int:
+        """
+        Нарастающий итог всей очереди, включая погашенный префикс.
+        """
+        return self.cumulative[-1] if self.cumulative else 0
+
+    @property
+    def count(self) -> int:
+        """
+        Количество открытых пожертвований.
+        """
+        return len(self.ids) - self.head
+
+    @property
+    def amount(self) -> int:
+        """
+        Суммарный остаток открытых пожертвований.
+        """
+        return self.total - self.consumed
+
+    def invalidate(self) -> None:
+        """
+        Помечает индекс устаревшим до следующей перестройки.
+        """
+        self.valid = False
+
+    async def rebuild(
+            self,
+            session: AsyncSession
+    ) -> None:
+        """
+        Перестраивает индекс по открытым пожертвованиям из базы данных.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        """
+        rows = await session.execute(
+            select(
+                Donation.id,
+                Donation.create_date,
+                Donation.full_amount - Donation.invested_amount
+            )
+            .where(Donation.fully_invested == false())
+            .order_by(Donation.create_date, Donation.id)
+        )
+        self.reset(rows.tuples())
+
+    async def ensure(
+            self,
+            session: AsyncSession
+    ) -> None:
+        """
+        Сверяет индекс со сводкой открытых средств и при расхождении
+        перестраивает его.
+
+        Вызывается под `single_writer`, чтобы сводка и очередь
+        не менялись во время сверки.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        """
+        result = await session.execute(
+            select(FundsSummary.open_donations, FundsSummary.open_donation_amount)
+            .where(FundsSummary.id == SUMMARY_ID)
+        )
+        count, amount = result.one()
+        if not self.valid or (count, amount) != (self.count, self.amount):
+            await self.rebuild(session)
+
+    def append(
+            self,
+            obj_id: int,
+            create_date: dt.datetime,
+            amount: int
+    ) -> None:
+        """
+        Добавляет новое пожертвование в конец очереди.
+
+        Если пожертвование оказалось не последним в порядке FIFO,
+        индекс помечается устаревшим.
+
+        Args:
+            obj_id (int): ID пожертвования.
+            create_date (dt.datetime): Дата создания.
+            amount (int): Остаток пожертвования.
+        """
+        if not self.valid:
+            return
+        if not self.count:
+            self.reset()
+        elif (create_date, obj_id) <= (self.create_dates[-1], self.ids[-1]):
+            self.invalidate()
+            return
+        self.ids.append(obj_id)
+        self.create_dates.append(create_date)
+        self.cumulative.append(self.total + amount)
+
+    def consume(
+            self,
+            amount: int,
+            first_id: Optional[int] = None
+    ) -> None:
+        """
+        Расходует сумму с начала очереди, закрывая погашенные пожертвования.
+
+        Args:
+            amount (int): Распределенная сумма пожертвований.
+            first_id (Optional[int]): ID пожертвования, которое должно
+                стоять в начале очереди. Если оно не первое, индекс
+                помечается устаревшим.
+        """
+        if not self.valid or not amount:
+            return
+        if amount > self.amount or (
+            first_id is not None and self.ids[self.head] != first_id
+        ):
+            self.invalidate()
+            return
+        self.consumed += amount
+        self.head = bisect_right(self.cumulative, self.consumed, lo=self.head)
+        if self.head * 2 > len(self.ids):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Отбрасывает погашенный префикс очереди.
+        """
+        self.ids = self.ids[self.head:]
+        self.create_dates = self.create_dates[self.head:]
+        self.cumulative = array(
+            'q', (total - self.consumed for total in self.cumulative[self.head:])
+        )
+        self.head = 0
+        self.consumed = 0
+
+    def cut(
+            self,
+            need: int
+    ) -> Cut:
+        """
+        Находит префикс очереди, покрывающий потребность проекта.
+
+        Args:
+            need (int): Недостающая сумма проекта.
+
+        Returns:
+            Cut: Граница префикса и распределенные суммы.
+        """
+        target = self.consumed + need
+        position = bisect_right(self.cumulative, target, lo=self.head)
+        closed = position - self.head
+        last_closed = None
+        previous = self.consumed
+        if closed:
+            last_closed = (
+                self.create_dates[position - 1], self.ids[position - 1]
+            )
+            previous = self.cumulative[position - 1]
+        if position == len(self.ids) or previous == target:
+            return Cut(closed, last_closed, None, 0, previous - self.consumed)
+        return Cut(
+            closed, last_closed, self.ids[position], target - previous, need
+        )
+
+
+donation_index = DonationIndex()
@@ -0,0 +1,52 @@
+from typing import AsyncIterator, Type, Union
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.models import CharityProject, Donation
+from app.services.serialization import dump_ndjson, schema_fields
+
+
+async def export_ndjson(
+        bind: Union[AsyncEngine, AsyncConnection],
+        model: Type[Union[CharityProject, Donation]],
+        schema: Type[BaseModel],
+        chunk_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """
+    Выгружает все объекты модели в формате NDJSON.
+
+    Строки читаются серверным курсором порциями по `chunk_size`
+    в порядке ID, без загрузки объектов ORM, и каждая порция сразу
+    отдается клиенту, поэтому расход памяти не зависит от размера
+    таблицы. Генератор открывает собственную сессию: сессия запроса
+    закрывается до того, как начинается передача ответа.
+
+    Args:
+        bind (Union[AsyncEngine, AsyncConnection]): Подключение к базе
+            данных.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        schema (Type[BaseModel]): Схема одной строки выгрузки; ее поля
+            совпадают с колонками модели.
+        chunk_size (int): Размер порции.
+
+    Yields:
+        bytes: Порция строк NDJSON.
+    """
+    table = model.__table__
+    fields = schema_fields(schema)
+    query = (
+        select(*(table.c[name] for name in fields))
+        .order_by(table.c.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async with AsyncSession(bind) as session:
+        result = await session.stream(query)
+        try:
+            async for partition in result.partitions():
+                yield dump_ndjson(partition, fields)
+        finally:
+            await result.close()
+
@@ -0,0 +1,159 @@
+import csv
+import datetime as dt
+import json
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Literal, Optional, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.db import single_writer
+from app.models import Donation
+from app.models.summary import summary_delta
+from app.models.version import version_bump
+from app.schemas.donation import DonationImport
+from app.services.donation_index import donation_index
+from app.services.investment import investment
+
+ImportFormat = Literal['csv', 'ndjson']
+
+
+def parse_records(
+        stream: TextIO,
+        fmt: ImportFormat
+) -> Iterator[dict]:
+    """
+    Читает записи из потока по одной, не загружая его целиком.
+
+    Args:
+        stream (TextIO): Текстовый поток с данными.
+        fmt (ImportFormat): Формат данных: 'csv' (с заголовком) или
+            'ndjson' (один объект JSON на строку).
+
+    Yields:
+        dict: Поля очередной записи.
+    """
+    if fmt == 'csv':
+        for record in csv.DictReader(stream):
+            yield {
+                key: value for key, value in record.items() if value != ''
+            }
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_donations(
+        stream: TextIO,
+        fmt: ImportFormat
+) -> Iterator[DonationImport]:
+    """
+    Читает и проверяет пожертвования из потока по одному.
+
+    Args:
+        stream (TextIO): Текстовый поток с данными.
+        fmt (ImportFormat): Формат данных.
+
+    Yields:
+        DonationImport: Проверенное пожертвование.
+
+    Raises:
+        ValueError: Если запись не разбирается или не проходит проверку.
+            В сообщении указывается номер записи.
+    """
+    records = parse_records(stream, fmt)
+    number = 0
+    while True:
+        number += 1
+        try:
+            record = next(records, None)
+            if record is None:
+                return
+            yield DonationImport.model_validate(record)
+        except (ValueError, ValidationError, csv.Error) as error:
+            raise ValueError(f'Запись {number}: {error}') from error
+
+
+async def insert_chunk(
+        session: AsyncSession,
+        chunk: List[DonationImport],
+        now: dt.datetime
+) -> None:
+    """
+    Добавляет порцию пожертвований одним пакетным INSERT и помечает
+    индекс открытых пожертвований устаревшим.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        chunk (List[DonationImport]): Порция пожертвований.
+        now (dt.datetime): Дата создания для записей без нее.
+    """
+    rows = [
+        {
+            'user_id': donation.user_id,
+            'full_amount': donation.full_amount,
+            'comment': donation.comment,
+            'create_date': donation.create_date or now,
+            'invested_amount': 0,
+            'fully_invested': False,
+        }
+        for donation in chunk
+    ]
+    async with single_writer(session):
+        await session.execute(insert(Donation.__table__), rows)
+        await session.execute(summary_delta(
+            Donation, len(rows), sum(donation.full_amount for donation in chunk)
+        ))
+        await session.execute(version_bump(Donation))
+        await session.commit()
+    # Импортированные записи не проходят через индекс открытых
+    # пожертвований и могут встать в середину очереди.
+    donation_index.invalidate()
+
+
+async def import_donations(
+        session_factory: async_sessionmaker[AsyncSession],
+        donations: Iterable[DonationImport],
+        chunk_size: int = 1000,
+        match_every: int = 0,
+        progress: Optional[Callable[[int, float], None]] = None
+) -> int:
+    """
+    Импортирует пожертвования порциями фиксированного размера.
+
+    Следующая порция читается из источника только после записи
+    предыдущей, поэтому в памяти держится не больше одной порции.
+    Каждая порция записывается в своей транзакции. Распределение средств
+    выполняется после каждых `match_every` порций и в конце импорта.
+
+    Args:
+        session_factory (async_sessionmaker[AsyncSession]): Фабрика сессий.
+        donations (Iterable[DonationImport]): Источник пожертвований.
+        chunk_size (int): Размер порции.
+        match_every (int): Через сколько порций запускать распределение;
+            0 - только в конце импорта.
+        progress (Optional[Callable[[int, float], None]]): Вызывается
+            после каждой порции с числом импортированных записей
+            и временем от начала импорта в секундах.
+
+    Returns:
+        int: Количество импортированных пожертвований.
+    """
+    donations = iter(donations)
+    started = time.perf_counter()
+    now = dt.datetime.now()
+    total = chunks = 0
+    async with session_factory() as session:
+        while chunk := list(islice(donations, chunk_size)):
+            await insert_chunk(session, chunk, now)
+            total += len(chunk)
+            chunks += 1
+            if match_every and chunks % match_every == 0:
+                await investment(session)
+            if progress is not None:
+                progress(total, time.perf_counter() - started)
+        await investment(session)
+    return total
@@ -1,41 +1,701 @@
-from sqlalchemy import select
+import datetime as dt
+from collections import defaultdict
+from typing import (AsyncGenerator, Dict, Optional, Sequence, Tuple, Type,
+                    Union)
+
+from sqlalchemy import (ColumnElement, DateTime, Integer, Select, Subquery,
+                        and_, bindparam, case, cast, false, func, insert,
+                        literal, null, select, tuple_, union_all, update)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Donation, CharityProject
+from app.core.config import settings
+from app.core.db import single_writer
+from app.models import Donation, CharityProject, FundsSummary, Investment
+from app.models.summary import SUMMARY_ID, summary_delta
+from app.models.version import version_bump
+from app.services.allocation import Balances
+from app.services.donation_index import StaleIndex, donation_index
+from app.services.strategies import AllocationStrategy, get_strategy
 
+INCREMENTAL_BATCH_SIZE = 100
 
-async def investment(
+QUEUE_MODELS: Tuple[Type[Union[CharityProject, Donation]], ...] = (
+    Donation, CharityProject
+)
+
+
+def invested_amounts(
+        allocations: Sequence[Tuple[int, int, int]],
+        position: int,
+        closed: Sequence[int]
+) -> Dict[int, int]:
+    """
+    Суммирует вложения в объекты, которые остались открытыми.
+
+    Args:
+        allocations (Sequence[Tuple[int, int, int]]): Тройки
+            (ID пожертвования, ID проекта, сумма).
+        position (int): Позиция ID объекта в тройке: 0 для пожертвований,
+            1 для проектов.
+        closed (Sequence[int]): ID объектов, закрытых распределением.
+
+    Returns:
+        Dict[int, int]: Вложенные суммы по ID открытых объектов.
+    """
+    closed_ids = set(closed)
+    amounts: Dict[int, int] = defaultdict(int)
+    for allocation in allocations:
+        obj_id = allocation[position]
+        if obj_id not in closed_ids:
+            amounts[obj_id] += allocation[2]
+    return amounts
+
+
+async def flush_changes(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]],
+        closed: Sequence[int],
+        invested: Dict[int, int],
+        close_date: dt.datetime
+) -> None:
+    """
+    Записывает результат распределения пакетными UPDATE.
+
+    Обновления выполняются через executemany по первичному ключу в обход
+    отслеживания изменений ORM, поэтому объекты не загружаются в сессию.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        closed (Sequence[int]): ID объектов, остаток которых исчерпан.
+        invested (Dict[int, int]): Суммы, вложенные в открытые объекты.
+        close_date (dt.datetime): Дата закрытия для всего прохода.
+    """
+    table = model.__table__
+    if closed:
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam('obj_id'))
+            .values(
+                invested_amount=table.c.full_amount,
+                fully_invested=True,
+                close_date=close_date
+            ),
+            [{'obj_id': obj_id} for obj_id in closed]
+        )
+    if invested:
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam('obj_id'))
+            .values(
+                invested_amount=table.c.invested_amount + bindparam('amount')
+            ),
+            [
+                {'obj_id': obj_id, 'amount': amount}
+                for obj_id, amount in invested.items()
+            ]
+        )
+
+
+async def record_allocations(
+        session: AsyncSession,
+        allocations: Sequence[Tuple[int, int, int]],
+        created_at: dt.datetime
+) -> None:
+    """
+    Записывает распределенные суммы в журнал одним пакетным INSERT.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        allocations (Sequence[Tuple[int, int, int]]): Тройки
+            (ID пожертвования, ID проекта, сумма).
+        created_at (dt.datetime): Дата распределения.
+    """
+    if allocations:
+        await session.execute(
+            insert(Investment.__table__),
+            [
+                {
+                    'donation_id': donation_id,
+                    'project_id': project_id,
+                    'amount': amount,
+                    'created_at': created_at,
+                }
+                for donation_id, project_id, amount in allocations
+            ]
+        )
+
+
+async def update_summary(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]],
+        closed: int,
+        amount: int
+) -> None:
+    """
+    Уменьшает сводку открытых средств на результат распределения.
+
+    Пакетные UPDATE не вызывают событий ORM, поэтому сводка
+    обновляется явно.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        closed (int): Количество закрытых объектов.
+        amount (int): Распределенная сумма.
+    """
+    if closed or amount:
+        await session.execute(summary_delta(model, -closed, -amount))
+
+
+async def open_counts(
         session: AsyncSession
+) -> Tuple[int, int]:
+    """
+    Читает из сводки количество открытых пожертвований и проектов.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        Tuple[int, int]: Количество открытых пожертвований и проектов.
+    """
+    result = await session.execute(
+        select(FundsSummary.open_donations, FundsSummary.open_projects)
+        .where(FundsSummary.id == SUMMARY_ID)
+    )
+    return tuple(result.one())
+
+
+def open_filter(
+        model: Type[Union[CharityProject, Donation]]
+) -> ColumnElement[bool]:
+    """
+    Возвращает условие отбора открытых объектов модели.
+
+    Условие записано как сравнение `fully_invested = false`, чтобы оно
+    совпадало с условием частичных индексов очередей открытых объектов.
+
+    Args:
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+
+    Returns:
+        ColumnElement[bool]: Условие для WHERE.
+    """
+    return model.fully_invested == false()
+
+
+def open_balances(
+        model: Type[Union[CharityProject, Donation]],
+        order_by: Optional[Tuple[ColumnElement, ...]] = None
+) -> Select:
+    """
+    Формирует запрос очереди открытых объектов модели.
+
+    Args:
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        order_by (Optional[Tuple[ColumnElement, ...]]): Порядок очереди;
+            по умолчанию - порядок создания.
+
+    Returns:
+        Select: Запрос пар (ID, остаток) в порядке очереди.
+    """
+    return (
+        select(model.id, model.full_amount - model.invested_amount)
+        .where(open_filter(model))
+        .order_by(*(order_by or (model.create_date, model.id)))
+    )
+
+
+async def single_chunk(
+        balances: Balances
+) -> AsyncGenerator[Balances, None]:
+    """
+    Представляет уже известные остатки как поток из одной порции.
+    """
+    yield balances
+
+
+async def stream_chunks(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]],
+        chunk_size: Optional[int],
+        order_by: Optional[Tuple[ColumnElement, ...]] = None
+) -> AsyncGenerator[Balances, None]:
+    """
+    Читает очередь открытых объектов модели потоком порций.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        chunk_size (Optional[int]): Размер порции; None - вся очередь
+            одной порцией.
+        order_by (Optional[Tuple[ColumnElement, ...]]): Порядок очереди.
+
+    Yields:
+        Balances: Порция остатков.
+    """
+    query = open_balances(model, order_by)
+    if chunk_size is None:
+        yield Balances.from_pairs(await session.execute(query))
+        return
+    result = await session.stream(
+        query.execution_options(yield_per=chunk_size)
+    )
+    try:
+        async for partition in result.partitions():
+            yield Balances.from_pairs(partition)
+    finally:
+        await result.close()
+
+
+async def python_investment(
+        session: AsyncSession,
+        target: Optional[Union[CharityProject, Donation]] = None,
+        strategy: Optional[AllocationStrategy] = None
+) -> int:
+    """
+    Распределяет средства по очередям открытых объектов в Python.
+
+    Очереди читаются потоком порций остатков без загрузки объектов ORM
+    в порядке, заданном стратегией, и распределяются ее функцией,
+    а изменения записываются пакетно после каждой порции. Чтение
+    прекращается, как только одна из очередей исчерпана, поэтому расход
+    памяти ограничен размером порции, а не числом открытых объектов.
+    Исключение - стратегии, которым нужна вся очередь проектов сразу.
+    Если передан целевой объект, очередью своей стороны служит только он.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        target (Optional[Union[CharityProject, Donation]]): Только что
+            созданный проект или пожертвование.
+        strategy (Optional[AllocationStrategy]): Стратегия распределения;
+            по умолчанию - выбранная в настройках.
+
+    Returns:
+        int: Распределенная сумма.
+    """
+    if target is not None and target.fully_invested:
+        return 0
+    strategy = strategy or get_strategy()
+    queues: Dict[type, AsyncGenerator[Balances, None]] = {}
+    chunk_size: Optional[int]
+    for model in QUEUE_MODELS:
+        if target is None:
+            chunk_size = settings.investment_chunk_size
+        else:
+            chunk_size = INCREMENTAL_BATCH_SIZE
+        if model is CharityProject and strategy.whole_queue:
+            chunk_size = None
+        if target is not None and isinstance(target, model):
+            queues[model] = single_chunk(Balances(
+                [target.id], [target.full_amount - target.invested_amount]
+            ))
+        else:
+            queues[model] = stream_chunks(
+                session, model, chunk_size, strategy.order_by(model)
+            )
+    now = dt.datetime.now()
+    donations = projects = Balances()
+    total = 0
+    try:
+        while True:
+            if not donations:
+                donations = await anext(queues[Donation], Balances())
+                if not donations:
+                    break
+            if not projects:
+                projects = await anext(queues[CharityProject], Balances())
+                if not projects:
+                    break
+            result = strategy.allocate(donations, projects)
+            await record_allocations(session, result.allocations, now)
+            allocated = sum(allocation[2] for allocation in result.allocations)
+            total += allocated
+            for position, (model, closed) in enumerate(zip(
+                QUEUE_MODELS, (result.closed_donations, result.closed_projects)
+            )):
+                await flush_changes(
+                    session, model, closed,
+                    invested_amounts(result.allocations, position, closed),
+                    now
+                )
+                await update_summary(session, model, len(closed), allocated)
+            donations, projects = result.donations_left, result.projects_left
+    finally:
+        for queue in queues.values():
+            await queue.aclose()
+    return total
+
+
+async def invest_prefix(
+        session: AsyncSession,
+        project: CharityProject
+) -> int:
+    """
+    Финансирует проект префиксом очереди открытых пожертвований.
+
+    Граница префикса находится по индексу `donation_index` двоичным
+    поиском, после чего полностью вложенные пожертвования закрываются
+    одним диапазонным UPDATE по ключу FIFO (дата создания, ID), а записи
+    журнала для них добавляются одним INSERT ... SELECT. Перед записью
+    количество и суммарный остаток пожертвований префикса в таблице
+    сверяются с индексом: совпадения одной сводки недостаточно, так как
+    индекс может содержать другие пожертвования с теми же итогами.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        project (CharityProject): Только что созданный проект.
+
+    Returns:
+        int: Распределенная сумма.
+
+    Raises:
+        StaleIndex: Если индекс разошелся с таблицей пожертвований.
+    """
+    need = project.full_amount - project.invested_amount
+    cut = donation_index.cut(need)
+    if not cut.allocated:
+        return 0
+    now = dt.datetime.now()
+    if cut.closed:
+        prefix = and_(
+            open_filter(Donation),
+            tuple_(Donation.create_date, Donation.id) <= cut.last_closed
+        )
+        remainder = Donation.full_amount - Donation.invested_amount
+        count, amount = (await session.execute(
+            select(func.count(), func.coalesce(func.sum(remainder), 0))
+            .where(prefix)
+        )).one()
+        if (count, amount) != (cut.closed, cut.allocated - cut.partial_amount):
+            raise StaleIndex
+        await session.execute(
+            insert(Investment).from_select(
+                ['donation_id', 'project_id', 'amount', 'created_at'],
+                select(
+                    Donation.id, literal(project.id, Integer),
+                    Donation.full_amount - Donation.invested_amount,
+                    literal(now, DateTime)
+                )
+                .where(prefix)
+                .order_by(Donation.create_date, Donation.id)
+            )
+        )
+        result = await session.execute(
+            update(Donation.__table__)
+            .where(prefix)
+            .values(
+                invested_amount=Donation.full_amount,
+                fully_invested=True,
+                close_date=now
+            )
+        )
+        if result.rowcount != cut.closed:
+            raise StaleIndex
+    if cut.partial_id is not None:
+        await record_allocations(
+            session, [(cut.partial_id, project.id, cut.partial_amount)], now
+        )
+        result = await session.execute(
+            update(Donation.__table__)
+            .where(
+                Donation.id == cut.partial_id,
+                open_filter(Donation),
+                Donation.full_amount - Donation.invested_amount
+                > cut.partial_amount
+            )
+            .values(
+                invested_amount=Donation.invested_amount + cut.partial_amount
+            )
+        )
+        if result.rowcount != 1:
+            raise StaleIndex
+    project_closed = cut.allocated == need
+    await flush_changes(
+        session, CharityProject,
+        [project.id] if project_closed else [],
+        {} if project_closed else {project.id: cut.allocated},
+        now
+    )
+    await update_summary(session, Donation, cut.closed, cut.allocated)
+    await update_summary(
+        session, CharityProject, int(project_closed), cut.allocated
+    )
+    return cut.allocated
+
+
+async def indexed_investment(
+        session: AsyncSession,
+        project: CharityProject
+) -> int:
+    """
+    Финансирует новый проект через индекс открытых пожертвований.
+
+    Индекс сверяется со сводкой открытых средств. Если при записи
+    обнаружится, что он все же устарел, изменения откатываются
+    до точки сохранения, а проход повторяется по перестроенному индексу.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        project (CharityProject): Только что созданный проект.
+
+    Returns:
+        int: Распределенная сумма.
+    """
+    if project.fully_invested:
+        return 0
+    await donation_index.ensure(session)
+    try:
+        async with session.begin_nested():
+            return await invest_prefix(session, project)
+    except StaleIndex:
+        await donation_index.rebuild(session)
+        return await invest_prefix(session, project)
+
+
+async def open_amount(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]]
+) -> int:
+    """
+    Считает суммарный свободный остаток открытых объектов модели.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+
+    Returns:
+        int: Сумма остатков открытых объектов.
+    """
+    amount = await session.execute(
+        select(
+            func.coalesce(func.sum(model.full_amount - model.invested_amount), 0)
+        ).where(open_filter(model))
+    )
+    return amount.scalar_one()
+
+
+def cumulative_balances(
+        model: Type[Union[CharityProject, Donation]],
+        order_by: Tuple[ColumnElement, ...]
+) -> Subquery:
+    """
+    Формирует подзапрос остатков открытых объектов с нарастающим итогом.
+
+    Args:
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        order_by (Tuple[ColumnElement, ...]): Порядок очереди.
+
+    Returns:
+        Subquery: Подзапрос с колонками id, remaining и cumulative.
+    """
+    remaining = model.full_amount - model.invested_amount
+    return select(
+        model.id,
+        remaining.label('remaining'),
+        func.sum(remaining).over(order_by=order_by).label('cumulative')
+    ).where(open_filter(model)).subquery()
+
+
+def ledger_rows(
+        strategy: AllocationStrategy,
+        total: int,
+        now: dt.datetime
+) -> Select:
+    """
+    Формирует выборку записей журнала для распределения суммы total.
+
+    Пожертвования и проекты, затронутые распределением, занимают
+    на общей оси нарастающих итогов отрезки, концы которых объединяются
+    в одну последовательность точек. Каждый промежуток между соседними
+    точками - одна запись журнала: пожертвование и проект, отрезки которых
+    его покрывают, - ближайшие справа концы своей стороны. Их ID
+    переносятся на промежуток оконными функциями, поэтому выборка
+    сортирует точки, а не перебирает пары пожертвований и проектов.
+
+    Args:
+        strategy (AllocationStrategy): Стратегия, задающая порядок очередей.
+        total (int): Распределяемая сумма.
+        now (dt.datetime): Дата записей журнала.
+
+    Returns:
+        Select: Выборка (ID пожертвования, ID проекта, сумма, дата).
+    """
+    sides = []
+    for model in QUEUE_MODELS:
+        balances = cumulative_balances(model, strategy.order_by(model))
+        obj_id = balances.c.id
+        no_id = cast(null(), Integer)
+        sides.append(
+            select(
+                case(
+                    (balances.c.cumulative < total, balances.c.cumulative),
+                    else_=total
+                ).label('point'),
+                (obj_id if model is Donation else no_id).label('donation_id'),
+                (obj_id if model is CharityProject else no_id).label(
+                    'project_id'
+                )
+            ).where(balances.c.cumulative - balances.c.remaining < total)
+        )
+    points = union_all(*sides).subquery()
+    # Номер группы - число концов стороны не левее точки: все точки
+    # группы покрывает отрезок одного объекта, конец которого в нее входит.
+    groups = select(
+        points.c.point,
+        func.lag(points.c.point, 1, 0).over(
+            order_by=points.c.point
+        ).label('previous'),
+        points.c.donation_id,
+        points.c.project_id,
+        func.count(points.c.donation_id).over(
+            order_by=points.c.point.desc()
+        ).label('donation_group'),
+        func.count(points.c.project_id).over(
+            order_by=points.c.point.desc()
+        ).label('project_group'),
+    ).subquery()
+    segments = select(
+        groups.c.point,
+        (groups.c.point - groups.c.previous).label('amount'),
+        func.max(groups.c.donation_id).over(
+            partition_by=groups.c.donation_group
+        ).label('donation_id'),
+        func.max(groups.c.project_id).over(
+            partition_by=groups.c.project_group
+        ).label('project_id'),
+    ).subquery()
+    return (
+        select(
+            segments.c.donation_id, segments.c.project_id, segments.c.amount,
+            literal(now, DateTime)
+        )
+        .where(segments.c.amount > 0)
+        .order_by(segments.c.point)
+    )
+
+
+async def sql_investment(
+        session: AsyncSession,
+        strategy: AllocationStrategy
+) -> int:
+    """
+    Распределяет средства целиком на стороне базы данных.
+
+    Последовательное распределение с обеих сторон заполняет префиксы очередей
+    открытых пожертвований и проектов на общую сумму, равную меньшему
+    из суммарных остатков. Поэтому вложенная в объект сумма вычисляется
+    по нарастающему итогу остатков (оконная функция), а изменения
+    применяются одним UPDATE на каждую таблицу. Записи журнала - это
+    пересечения отрезков, которые пожертвования и проекты занимают
+    на общей оси нарастающих итогов (см. `ledger_rows`).
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        strategy (AllocationStrategy): Стратегия, задающая порядок очередей.
+            Должна поддерживать механизм 'sql'.
+
+    Returns:
+        int: Распределенная сумма.
+    """
+    total = min(
+        await open_amount(session, Donation),
+        await open_amount(session, CharityProject)
+    )
+    if total == 0:
+        return 0
+    now = dt.datetime.now()
+    await session.execute(
+        insert(Investment).from_select(
+            ['donation_id', 'project_id', 'amount', 'created_at'],
+            ledger_rows(strategy, total, now)
+        )
+    )
+    for model in QUEUE_MODELS:
+        balances = cumulative_balances(model, strategy.order_by(model))
+        closed = balances.c.cumulative <= total
+        touched = balances.c.cumulative - balances.c.remaining < total
+        closed_count = (await session.execute(
+            select(func.count()).select_from(balances).where(touched, closed)
+        )).scalar_one()
+        await update_summary(session, model, closed_count, total)
+        await session.execute(
+            update(model)
+            .where(model.id == balances.c.id, touched)
+            .values(
+                invested_amount=model.invested_amount + case(
+                    (closed, balances.c.remaining),
+                    else_=total - balances.c.cumulative + balances.c.remaining
+                ),
+                fully_invested=closed,
+                close_date=case((closed, now), else_=model.close_date)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return total
+
+
+async def investment(
+        session: AsyncSession,
+        target: Optional[Union[CharityProject, Donation]] = None
 ) -> None:
-    donations = await session.scalars(
-        select(Donation).where(Donation.fully_invested.is_(False))
-    )
-    projects = await session.scalars(
-        select(CharityProject).where(CharityProject.fully_invested.is_(False))
-    )
-    for project in projects:
-        project_amount = project.full_amount - project.invested_amount
-        donation = donations.first()
-        while not project.fully_invested:
-            if donation is None:
-                break
-            donation_amount = donation.full_amount - donation.invested_amount
-            if project_amount > donation_amount:
-                project.invested_amount += donation_amount
-                donation.invested_amount += donation_amount
-                donation.fully_invested = True
-            elif project_amount == donation_amount:
-                project.invested_amount += donation_amount
-                donation.invested_amount += donation_amount
-                project.fully_invested = True
-                donation.fully_invested = True
+    """
+    Распределяет свободные средства пожертвований по открытым проектам.
+
+    Проход выполняется под `single_writer`, поэтому конкурентные запросы
+    не могут распределить одни и те же остатки дважды. Если по сводке
+    открытых средств сопоставлять нечего, проход пропускается без
+    блокировки и чтения очередей: объект, созданный конкурентно, будет
+    сопоставлен проходом, запущенным после его сохранения.
+
+    Порядок очередей и правило распределения задает стратегия
+    из настройки `investment_strategy`; стратегии, которые механизм 'sql'
+    не поддерживает, выполняются механизмом 'python'. Новый проект
+    механизм 'python' при любой стратегии финансирует через индекс
+    открытых пожертвований `donation_index`: единственный проект
+    получает пожертвования по FIFO. После прохода индекс расходуется
+    на распределенную сумму.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        target (Optional[Union[CharityProject, Donation]]): Только что
+            созданный объект. Если передан, сопоставляется только он,
+            иначе выполняется полный проход по открытым объектам.
+            Механизм 'sql' всегда выполняет полный проход. Проход
+            по объекту не сопоставляет между собой остальные открытые
+            объекты; для этого служит полный проход, например команда
+            `python -m app.cli match`.
+    """
+    open_donations, open_projects = await open_counts(session)
+    if not open_donations or not open_projects:
+        return
+    strategy = get_strategy()
+    async with single_writer(session):
+        if settings.investment_engine == 'sql' and strategy.sql_supported:
+            allocated = await sql_investment(session, strategy)
+        else:
+            if target is not None:
+                # Пока проход ждал блокировку, объект мог быть распределен
+                # другим проходом.
+                await session.refresh(target)
+            if isinstance(target, CharityProject):
+                allocated = await indexed_investment(session, target)
             else:
-                project.invested_amount += project_amount
-                donation.invested_amount += project_amount
-                project.fully_invested = True
-            if donations.closed:
-                break
-            donation = donations.first()
-        if donations.closed:
-            break
-    await session.commit()
+                allocated = await python_investment(session, target, strategy)
+        if allocated:
+            await session.execute(version_bump(Donation, CharityProject))
+        first_id = target.id if isinstance(target, Donation) else None
+        try:
+            await session.commit()
+        except Exception:
+            donation_index.invalidate()
+            raise
+        donation_index.consume(allocated, first_id)
@@ -0,0 +1,173 @@
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple, Type, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, FundsSummary
+from app.models.summary import SUMMARY_ID
+from app.services.allocation import Balances
+from app.services.investment import stream_chunks
+from app.services.strategies import AllocationStrategy, get_strategy
+
+
+class Preview(NamedTuple):
+    """
+    Прогноз распределения средств для нового объекта.
+
+    Attributes:
+        invested_amount (int): Сумма, которая была бы распределена сразу.
+        fully_invested (bool): Был бы объект закрыт сразу.
+        allocations (List[Tuple[int, int]]): Пары (ID объекта другой
+            стороны, сумма) в порядке распределения.
+    """
+    invested_amount: int
+    fully_invested: bool
+    allocations: List[Tuple[int, int]]
+
+
+async def queue_version(
+        session: AsyncSession
+) -> int:
+    """
+    Читает версию очередей открытых объектов из сводки.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        int: Версия очередей.
+    """
+    return (await session.execute(
+        select(FundsSummary.version).where(FundsSummary.id == SUMMARY_ID)
+    )).scalar_one()
+
+
+class PreviewCache:
+    """
+    Кэш снимков очередей открытых объектов и прогнозов распределения.
+
+    Снимок - остатки всей очереди в порядке стратегии, прочитанные
+    в память. Снимки и прогнозы хранятся по версии очередей из сводки
+    открытых средств: пока очереди не менялись, повторный прогноз
+    не читает очередь и не пересчитывается. Снимок, во время чтения
+    которого версия изменилась, не кэшируется.
+
+    Attributes:
+        max_size (int): Наибольшее количество хранимых прогнозов.
+        snapshots (Dict[Tuple[type, str], Tuple[int, Balances]]): Последний
+            снимок очереди модели для каждой стратегии вместе с его версией.
+        results (OrderedDict): Прогнозы по ключу (версия, стратегия,
+            модель, сумма) в порядке последнего использования.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 256
+    ):
+        self.max_size = max_size
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Очищает кэш.
+        """
+        self.snapshots: Dict[Tuple[type, str], Tuple[int, Balances]] = {}
+        self.results: OrderedDict = OrderedDict()
+
+    async def snapshot(
+            self,
+            session: AsyncSession,
+            model: Type[Union[CharityProject, Donation]],
+            strategy: AllocationStrategy,
+            version: int
+    ) -> Tuple[Balances, bool]:
+        """
+        Возвращает снимок очереди открытых объектов модели.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            model (Type[Union[CharityProject, Donation]]): Модель проекта
+                или пожертвования.
+            strategy (AllocationStrategy): Стратегия, задающая порядок
+                очереди.
+            version (int): Версия очередей, прочитанная до снимка.
+
+        Returns:
+            Tuple[Balances, bool]: Снимок и признак того, что он
+            соответствует версии `version`.
+        """
+        key = (model, strategy.name)
+        cached = self.snapshots.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1], True
+        queue = Balances()
+        async for chunk in stream_chunks(
+            session, model, None, strategy.order_by(model)
+        ):
+            queue = chunk
+        if await queue_version(session) != version:
+            return queue, False
+        self.snapshots[key] = (version, queue)
+        return queue, True
+
+    async def preview(
+            self,
+            session: AsyncSession,
+            model: Type[Union[CharityProject, Donation]],
+            amount: int
+    ) -> Preview:
+        """
+        Рассчитывает, как были бы распределены средства нового объекта.
+
+        Расчет выполняется функцией распределения текущей стратегии
+        над снимком очереди другой стороны. Сессия используется только
+        для чтения: ничего не добавляется, не сбрасывается и не фиксируется.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            model (Type[Union[CharityProject, Donation]]): Модель нового
+                объекта.
+            amount (int): Полная сумма нового объекта.
+
+        Returns:
+            Preview: Прогноз распределения.
+        """
+        strategy = get_strategy()
+        version = await queue_version(session)
+        key = (version, strategy.name, model, amount)
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        target = Balances([0], [amount])
+        if model is CharityProject:
+            queue, consistent = await self.snapshot(
+                session, Donation, strategy, version
+            )
+            result = strategy.allocate(queue, target)
+            allocations = [
+                (donation_id, share)
+                for donation_id, _, share in result.allocations
+            ]
+        else:
+            queue, consistent = await self.snapshot(
+                session, CharityProject, strategy, version
+            )
+            result = strategy.allocate(target, queue)
+            allocations = [
+                (project_id, share)
+                for _, project_id, share in result.allocations
+            ]
+        invested_amount = sum(share for _, share in allocations)
+        preview = Preview(
+            invested_amount, invested_amount == amount, allocations
+        )
+        if consistent:
+            self.results[key] = preview
+            if len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+        return preview
+
+
+preview_cache = PreviewCache(settings.preview_cache_size)
@@ -0,0 +1,348 @@
+import datetime as dt
+import time
+from typing import (AsyncIterator, Callable, Dict, List, NamedTuple, Optional,
+                    Sequence, Tuple, Type, Union)
+
+from sqlalchemy import (Row, bindparam, delete, false, func, insert, select,
+                        tuple_, update)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.db import single_writer
+from app.models import CharityProject, Donation, FundsSummary, Investment
+from app.models.version import version_bump
+from app.services.allocation import Balances, allocate
+from app.services.donation_index import donation_index
+from app.services.investment import QUEUE_MODELS
+from app.services.strategies import AllocationStrategy, get_strategy
+
+State = Tuple[int, bool]
+
+
+class Difference(NamedTuple):
+    """
+    Расхождение текущего состояния объекта с результатом повторного
+    распределения.
+
+    Attributes:
+        table (str): Имя таблицы объекта.
+        obj_id (int): ID объекта.
+        current (State): Текущие (invested_amount, fully_invested).
+        replayed (State): Те же поля после повторного распределения.
+    """
+    table: str
+    obj_id: int
+    current: State
+    replayed: State
+
+
+class ReplayReport:
+    """
+    Итоги повторного распределения.
+
+    Attributes:
+        processed (int): Количество обработанных объектов.
+        changed (Dict[str, int]): Количество измененных объектов по таблицам.
+        allocated (int): Вся распределенная сумма.
+        differences (List[Difference]): Первые найденные расхождения.
+        sample_size (int): Сколько расхождений сохранять в `differences`.
+    """
+
+    def __init__(
+            self,
+            sample_size: int = 20
+    ):
+        self.processed = 0
+        self.changed = {Donation.__tablename__: 0, CharityProject.__tablename__: 0}
+        self.allocated = 0
+        self.differences: List[Difference] = []
+        self.sample_size = sample_size
+
+    def add(
+            self,
+            difference: Difference
+    ) -> None:
+        """
+        Учитывает расхождение.
+
+        Args:
+            difference (Difference): Найденное расхождение.
+        """
+        self.changed[difference.table] += 1
+        if len(self.differences) < self.sample_size:
+            self.differences.append(difference)
+
+
+async def keyset_chunks(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]],
+        chunk_size: int
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Читает все объекты модели в порядке FIFO порциями по ключу
+    (дата создания, ID).
+
+    Каждая порция читается отдельным запросом, поэтому между порциями
+    можно фиксировать транзакции.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+        chunk_size (int): Размер порции.
+
+    Yields:
+        Sequence[Row]: Порция строк с полями id, full_amount,
+        invested_amount, fully_invested, close_date и create_date.
+    """
+    key = tuple_(model.create_date, model.id)
+    last = None
+    while True:
+        query = select(
+            model.id, model.full_amount, model.invested_amount,
+            model.fully_invested, model.close_date, model.create_date
+        ).order_by(model.create_date, model.id).limit(chunk_size)
+        if last is not None:
+            query = query.where(key > last)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1].create_date, rows[-1].id)
+
+
+async def write_changes(
+        session: AsyncSession,
+        changes: Dict[Type[Union[CharityProject, Donation]], List[dict]],
+        ledger: List[dict]
+) -> None:
+    """
+    Записывает изменения одной порции в отдельной транзакции.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        changes (Dict[Type[Union[CharityProject, Donation]], List[dict]]):
+            Новые значения полей по моделям.
+        ledger (List[dict]): Записи журнала распределения.
+    """
+    async with single_writer(session):
+        for model, values in changes.items():
+            if values:
+                table = model.__table__
+                await session.execute(
+                    update(table)
+                    .where(table.c.id == bindparam('obj_id'))
+                    .values(
+                        invested_amount=bindparam('invested_amount'),
+                        fully_invested=bindparam('fully_invested'),
+                        close_date=bindparam('close_date')
+                    ),
+                    values
+                )
+        if ledger:
+            await session.execute(insert(Investment.__table__), ledger)
+        changed = [model for model, values in changes.items() if values]
+        if changed:
+            await session.execute(version_bump(*changed))
+        await session.commit()
+
+
+async def refresh_summary(
+        session: AsyncSession
+) -> None:
+    """
+    Пересчитывает сводку открытых средств по таблицам.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+    """
+    values = {}
+    for model, (count_column, amount_column) in zip(QUEUE_MODELS, (
+        ('open_donations', 'open_donation_amount'),
+        ('open_projects', 'open_project_amount'),
+    )):
+        opened = model.fully_invested == false()
+        values[count_column] = (
+            select(func.count()).select_from(model).where(opened)
+            .scalar_subquery()
+        )
+        values[amount_column] = select(
+            func.coalesce(func.sum(model.full_amount - model.invested_amount), 0)
+        ).where(opened).scalar_subquery()
+    async with single_writer(session):
+        await session.execute(
+            update(FundsSummary).values(**values, version=FundsSummary.version + 1)
+        )
+        await session.commit()
+
+
+async def replay(
+        session_factory: async_sessionmaker[AsyncSession],
+        chunk_size: int = 1000,
+        dry_run: bool = False,
+        sample_size: int = 20,
+        progress: Optional[Callable[[int, float], None]] = None,
+        strategy: Optional[AllocationStrategy] = None
+) -> ReplayReport:
+    """
+    Повторяет распределение средств по FIFO по всей истории с нуля.
+
+    Поддерживается только стратегия 'fifo': только при ней итог не зависит
+    от того, какие объекты были открыты в момент создания каждого
+    следующего. При другой стратегии команда отказывается работать,
+    ничего не изменяя, чтобы не переписать распределение по FIFO.
+
+    Пожертвования и проекты читаются порциями по ключу (дата создания, ID)
+    и распределяются функцией `allocate` так, как если бы каждый объект
+    сопоставлялся в момент создания. Итоговое состояние объекта известно,
+    когда он закрыт или когда очередь другой стороны исчерпана; только
+    тогда он сравнивается с текущим и, если отличается, записывается.
+    Каждая порция фиксируется своей транзакцией, поэтому блокировка
+    записи не удерживается на все время работы.
+
+    Журнал распределения строится заново; датой записи журнала и датой
+    закрытия вновь закрытых объектов служит дата создания более позднего
+    из пары объектов. У объектов, закрытых и до, и после повторного
+    распределения, дата закрытия сохраняется.
+
+    Команду следует запускать, когда приложение не принимает пожертвований
+    и проектов: промежуточные состояния видны другим подключениям.
+
+    Args:
+        session_factory (async_sessionmaker[AsyncSession]): Фабрика сессий.
+        chunk_size (int): Размер порции чтения.
+        dry_run (bool): Только сравнить с текущим состоянием, ничего
+            не записывая.
+        sample_size (int): Сколько расхождений сохранить в отчете.
+        progress (Optional[Callable[[int, float], None]]): Вызывается
+            после каждой порции с числом обработанных объектов
+            и временем от начала в секундах.
+        strategy (Optional[AllocationStrategy]): Стратегия распределения;
+            по умолчанию выбранная в настройках.
+
+    Returns:
+        ReplayReport: Итоги повторного распределения.
+
+    Raises:
+        ValueError: Если стратегия распределения не 'fifo'.
+    """
+    strategy = strategy or get_strategy()
+    if strategy.name != 'fifo':
+        raise ValueError(
+            f'повторное распределение поддерживает только стратегию fifo, '
+            f'в настройках выбрана {strategy.name}'
+        )
+    report = ReplayReport(sample_size)
+    started = time.perf_counter()
+    models = QUEUE_MODELS
+    rows: Dict[Type[Union[CharityProject, Donation]], Dict[int, Row]] = {
+        model: {} for model in models
+    }
+    closed_at: Dict[
+        Type[Union[CharityProject, Donation]], Dict[int, dt.datetime]
+    ] = {model: {} for model in models}
+    queues = {model: Balances() for model in models}
+
+    def finalize(
+            model: Type[Union[CharityProject, Donation]],
+            row: Row,
+            replayed: State
+    ) -> Optional[dict]:
+        report.processed += 1
+        current = (row.invested_amount, row.fully_invested)
+        if replayed == current:
+            return None
+        report.add(Difference(model.__tablename__, row.id, current, replayed))
+        if not replayed[1]:
+            close_date = None
+        elif row.fully_invested:
+            close_date = row.close_date
+        else:
+            close_date = closed_at[model].pop(row.id, row.create_date)
+        return {
+            'obj_id': row.id,
+            'invested_amount': replayed[0],
+            'fully_invested': replayed[1],
+            'close_date': close_date,
+        }
+
+    async def flush(
+            changes: Dict[Type[Union[CharityProject, Donation]], List[dict]],
+            ledger: List[dict]
+    ) -> None:
+        if not dry_run:
+            await write_changes(session, changes, ledger)
+        if progress is not None:
+            progress(report.processed, time.perf_counter() - started)
+
+    async with session_factory() as session:
+        if not dry_run:
+            async with single_writer(session):
+                await session.execute(delete(Investment.__table__))
+                await session.commit()
+        readers = {
+            model: keyset_chunks(session, model, chunk_size) for model in models
+        }
+        while True:
+            for model in models:
+                if not queues[model]:
+                    chunk = await anext(readers[model], None)
+                    if chunk:
+                        rows[model].update((row.id, row) for row in chunk)
+                        queues[model] = Balances.from_pairs(
+                            (row.id, row.full_amount) for row in chunk
+                        )
+            if not queues[Donation] or not queues[CharityProject]:
+                break
+            result = allocate(queues[Donation], queues[CharityProject])
+            ledger = []
+            for donation_id, project_id, amount in result.allocations:
+                created_at = max(
+                    rows[Donation][donation_id].create_date,
+                    rows[CharityProject][project_id].create_date
+                )
+                closed_at[Donation][donation_id] = created_at
+                closed_at[CharityProject][project_id] = created_at
+                ledger.append({
+                    'donation_id': donation_id,
+                    'project_id': project_id,
+                    'amount': amount,
+                    'created_at': created_at,
+                })
+                report.allocated += amount
+            changes: Dict[
+                Type[Union[CharityProject, Donation]], List[dict]
+            ] = {model: [] for model in models}
+            for model, closed in zip(
+                models, (result.closed_donations, result.closed_projects)
+            ):
+                for obj_id in closed:
+                    row = rows[model].pop(obj_id)
+                    change = finalize(model, row, (row.full_amount, True))
+                    closed_at[model].pop(obj_id, None)
+                    if change is not None:
+                        changes[model].append(change)
+            await flush(changes, ledger)
+            queues[Donation] = result.donations_left
+            queues[CharityProject] = result.projects_left
+        for model in models:
+            changes = {model: []}
+            for obj_id, remaining in queues[model]:
+                row = rows[model].pop(obj_id)
+                change = finalize(
+                    model, row, (row.full_amount - remaining, False)
+                )
+                if change is not None:
+                    changes[model].append(change)
+            if changes[model]:
+                await flush(changes, [])
+            async for chunk in readers[model]:
+                changes = {model: []}
+                for row in chunk:
+                    change = finalize(model, row, (0, False))
+                    if change is not None:
+                        changes[model].append(change)
+                await flush(changes, [])
+        if not dry_run:
+            await refresh_summary(session)
+            donation_index.invalidate()
+    return report
@@ -0,0 +1,246 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Mapping, Optional, Type, Union
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import CharityProject, DataVersion, Donation
+
+GZIP_MIN_SIZE = 1024
+
+
+async def data_version(
+        session: AsyncSession,
+        model: Type[Union[CharityProject, Donation]]
+) -> int:
+    """
+    Читает версию данных таблицы модели.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+        model (Type[Union[CharityProject, Donation]]): Модель проекта
+            или пожертвования.
+
+    Returns:
+        int: Версия данных таблицы.
+    """
+    return (await session.execute(
+        select(DataVersion.version)
+        .where(DataVersion.table_name == model.__tablename__)
+    )).scalar_one()
+
+
+def make_etag(
+        version: int,
+        *parts: Hashable
+) -> str:
+    """
+    Формирует сильный ETag ответа по версии данных и параметрам запроса.
+
+    Args:
+        version (int): Версия данных таблицы.
+        *parts (Hashable): Параметры, от которых зависит тело ответа:
+            имя ресурса, параметры страницы, ID пользователя.
+
+    Returns:
+        str: ETag в кавычках.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def gzip_etag(
+        etag: str
+) -> str:
+    """
+    Возвращает ETag сжатого представления того же ответа.
+
+    Args:
+        etag (str): ETag несжатого ответа.
+
+    Returns:
+        str: ETag сжатого ответа.
+    """
+    return f'{etag[:-1]}-gzip"'
+
+
+def not_modified(
+        request: Request,
+        etag: str
+) -> Optional[Response]:
+    """
+    Проверяет заголовок If-None-Match запроса.
+
+    Совпадением считается и ETag сжатого представления ответа.
+
+    Args:
+        request (Request): Запрос.
+        etag (str): ETag текущего ответа.
+
+    Returns:
+        Optional[Response]: Ответ 304 Not Modified или None, если ответ
+        изменился.
+    """
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return None
+    for candidate in header.split(','):
+        candidate = candidate.strip().removeprefix('W/')
+        if candidate == '*':
+            candidate = etag
+        if candidate in (etag, gzip_etag(etag)):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={'etag': candidate}
+            )
+    return None
+
+
+class CachedBody:
+    """
+    Готовое тело ответа и его заголовки.
+
+    Сжатое тело строится при первом запросе с `Accept-Encoding: gzip`
+    и хранится вместе с несжатым.
+
+    Attributes:
+        body (bytes): Тело ответа.
+        headers (Dict[str, str]): Заголовки ответа.
+        gzipped (Optional[bytes]): Сжатое тело, если уже построено.
+    """
+    __slots__ = ('body', 'headers', 'gzipped')
+
+    def __init__(
+            self,
+            body: bytes,
+            headers: Mapping[str, str]
+    ):
+        self.body = body
+        self.headers = dict(headers)
+        self.gzipped: Optional[bytes] = None
+
+    def response(
+            self,
+            accept_encoding: str = ''
+    ) -> Response:
+        """
+        Формирует ответ, при возможности сжатый. ETag сжатого ответа
+        отличается от ETag несжатого.
+
+        Args:
+            accept_encoding (str): Заголовок Accept-Encoding запроса.
+
+        Returns:
+            Response: Ответ с телом JSON.
+        """
+        headers = dict(self.headers, vary='Accept-Encoding')
+        body = self.body
+        if (
+            settings.response_cache_gzip
+            and len(body) >= GZIP_MIN_SIZE
+            and 'gzip' in accept_encoding
+        ):
+            if self.gzipped is None:
+                self.gzipped = gzip.compress(body)
+            body = self.gzipped
+            headers['content-encoding'] = 'gzip'
+            if 'etag' in headers:
+                headers['etag'] = gzip_etag(headers['etag'])
+        return Response(body, media_type='application/json', headers=headers)
+
+
+class ResponseCache:
+    """
+    Ограниченный по размеру кэш готовых ответов в памяти процесса.
+
+    Ключ включает версию данных таблицы, поэтому после записи в таблицу
+    старые ответы больше не запрашиваются и вытесняются как давно
+    не использованные.
+
+    Attributes:
+        max_size (int): Наибольшее количество хранимых ответов.
+        entries (OrderedDict): Ответы в порядке последнего использования.
+        hits (int): Количество ответов, взятых из кэша.
+        misses (int): Количество ответов, построенных заново.
+        evictions (int): Количество вытесненных ответов.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 64
+    ):
+        self.max_size = max_size
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Очищает кэш и счетчики.
+        """
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(
+            self,
+            key: Hashable
+    ) -> Optional[CachedBody]:
+        """
+        Ищет ответ в кэше и учитывает попадание или промах.
+
+        Args:
+            key (Hashable): Ключ ответа.
+
+        Returns:
+            Optional[CachedBody]: Найденный ответ или None.
+        """
+        cached = self.entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return cached
+
+    def put(
+            self,
+            key: Hashable,
+            body: bytes,
+            headers: Mapping[str, str]
+    ) -> CachedBody:
+        """
+        Сохраняет ответ, вытесняя давно не использованные.
+
+        Args:
+            key (Hashable): Ключ ответа.
+            body (bytes): Тело ответа.
+            headers (Mapping[str, str]): Заголовки ответа.
+
+        Returns:
+            CachedBody: Сохраненный ответ.
+        """
+        cached = self.entries[key] = CachedBody(body, headers)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return cached
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает счетчики кэша.
+
+        Returns:
+            Dict[str, int]: Попадания, промахи, вытеснения и размер.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'max_size': self.max_size,
+        }
+
+
+project_list_cache = ResponseCache(settings.response_cache_size)
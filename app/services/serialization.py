@@ -0,0 +1,153 @@
+import datetime as dt
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+
+def encode_default(
+        value: Any
+) -> str:
+    """
+    Сериализует значения, которые orjson не обрабатывает сам.
+
+    orjson сериализует только точный тип `datetime`, а не его подклассы
+    (например, даты freezegun).
+
+    Args:
+        value (Any): Значение.
+
+    Returns:
+        str: Дата в формате ISO 8601.
+
+    Raises:
+        TypeError: Если тип значения не поддерживается.
+    """
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    raise TypeError
+
+
+def schema_fields(
+        schema: Type[BaseModel],
+        exclude: Iterable[str] = ()
+) -> List[str]:
+    """
+    Возвращает поля схемы в порядке вывода.
+
+    Args:
+        schema (Type[BaseModel]): Схема ответа.
+        exclude (Iterable[str]): Поля, которые не нужно выдавать.
+
+    Returns:
+        List[str]: Имена полей; они же имена колонок модели.
+    """
+    exclude = set(exclude)
+    return [name for name in schema.model_fields if name not in exclude]
+
+
+def row_dicts(
+        rows: Iterable[Row],
+        fields: Sequence[str],
+        exclude_none: bool = True
+) -> List[dict]:
+    """
+    Превращает строки выборки в словари с полями схемы.
+
+    Args:
+        rows (Iterable[Row]): Строки с колонками в порядке `fields`.
+        fields (Sequence[str]): Имена полей.
+        exclude_none (bool): Пропускать поля со значением None, как это
+            делает `response_model_exclude_none`.
+
+    Returns:
+        List[dict]: Словари в порядке строк.
+    """
+    if exclude_none:
+        return [
+            {
+                name: value for name, value in zip(fields, row)
+                if value is not None
+            }
+            for row in rows
+        ]
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def dump_rows(
+        rows: Iterable[Row],
+        fields: Sequence[str],
+        exclude_none: bool = True
+) -> bytes:
+    """
+    Сериализует строки выборки в массив JSON средствами orjson.
+
+    Результат совпадает с тем, что FastAPI строит по `response_model`
+    для тех же полей: orjson выводит даты в формате ISO 8601, как
+    и pydantic, а строки - без экранирования не-ASCII символов.
+
+    Args:
+        rows (Iterable[Row]): Строки с колонками в порядке `fields`.
+        fields (Sequence[str]): Имена полей.
+        exclude_none (bool): Пропускать поля со значением None.
+
+    Returns:
+        bytes: Массив JSON.
+    """
+    return orjson.dumps(
+        row_dicts(rows, fields, exclude_none), default=encode_default
+    )
+
+
+def dump_ndjson(
+        rows: Iterable[Row],
+        fields: Sequence[str],
+        exclude_none: bool = True
+) -> bytes:
+    """
+    Сериализует строки выборки в NDJSON: по объекту JSON на строку.
+
+    Args:
+        rows (Iterable[Row]): Строки с колонками в порядке `fields`.
+        fields (Sequence[str]): Имена полей.
+        exclude_none (bool): Пропускать поля со значением None.
+
+    Returns:
+        bytes: Строки NDJSON, каждая с переводом строки в конце.
+    """
+    return b''.join(
+        orjson.dumps(
+            item, default=encode_default, option=orjson.OPT_APPEND_NEWLINE
+        )
+        for item in row_dicts(rows, fields, exclude_none)
+    )
+
+
+def rows_response(
+        rows: Iterable[Row],
+        fields: Sequence[str],
+        headers: Optional[Mapping[str, str]] = None,
+        exclude_none: bool = True
+) -> Response:
+    """
+    Формирует ответ со списком строк, минуя `response_model`.
+
+    Args:
+        rows (Iterable[Row]): Строки с колонками в порядке `fields`.
+        fields (Sequence[str]): Имена полей.
+        headers (Optional[Mapping[str, str]]): Заголовки ответа. Заголовки,
+            установленные через параметр `Response` эндпоинта, к ответу,
+            возвращенному напрямую, не добавляются, поэтому их нужно
+            передать здесь.
+        exclude_none (bool): Пропускать поля со значением None.
+
+    Returns:
+        Response: Ответ с массивом JSON.
+    """
+    return Response(
+        dump_rows(rows, fields, exclude_none),
+        media_type='application/json',
+        headers=headers
+    )
@@ -0,0 +1,118 @@
+from typing import Callable, Dict, Tuple, Type, Union
+
+from sqlalchemy import ColumnElement
+
+from app.core.config import settings
+from app.models import CharityProject, Donation
+from app.services.allocation import (Allocation, Balances, allocate,
+                                     allocate_proportional)
+
+
+class AllocationStrategy:
+    """
+    Стратегия сопоставления пожертвований и проектов.
+
+    Стратегия задает порядок, в котором читаются очереди открытых
+    объектов, и функцию распределения одной порции очередей. Пожертвования
+    во всех стратегиях расходуются в порядке FIFO.
+
+    Attributes:
+        name (str): Имя стратегии в настройке `investment_strategy`.
+        kernel (Callable[[Balances, Balances], Allocation]): Чистая функция
+            распределения порции очередей.
+        whole_queue (bool): Функции распределения нужна вся очередь
+            открытых проектов, а не порция.
+        sql_supported (bool): Стратегию можно выполнить механизмом 'sql',
+            заполняющим префиксы очередей по нарастающим итогам.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            kernel: Callable[[Balances, Balances], Allocation] = allocate,
+            whole_queue: bool = False,
+            sql_supported: bool = True
+    ):
+        self.name = name
+        self.kernel = kernel
+        self.whole_queue = whole_queue
+        self.sql_supported = sql_supported
+
+    def order_by(
+            self,
+            model: Type[Union[CharityProject, Donation]]
+    ) -> Tuple[ColumnElement, ...]:
+        """
+        Возвращает порядок очереди открытых объектов модели.
+
+        Args:
+            model (Type[Union[CharityProject, Donation]]): Модель проекта
+                или пожертвования.
+
+        Returns:
+            Tuple[ColumnElement, ...]: Выражения для ORDER BY.
+        """
+        return model.create_date.expression, model.id.expression
+
+    def allocate(
+            self,
+            donations: Balances,
+            projects: Balances
+    ) -> Allocation:
+        """
+        Распределяет порцию очередей функцией стратегии.
+
+        Args:
+            donations (Balances): Очередь остатков открытых пожертвований.
+            projects (Balances): Очередь остатков открытых проектов.
+
+        Returns:
+            Allocation: Распределенные суммы, закрытые объекты и остатки
+            очередей.
+        """
+        return self.kernel(donations, projects)
+
+
+class SmallestRemainingStrategy(AllocationStrategy):
+    """
+    Стратегия, финансирующая первыми проекты с наименьшей недостающей
+    суммой.
+
+    Распределение остается последовательным: меняется только порядок
+    очереди проектов, а частично профинансированный проект остается
+    в ее начале, так как его недостающая сумма только уменьшается.
+    Очередь читается по индексу ix_charityproject_open_remaining.
+    """
+
+    def order_by(
+            self,
+            model: Type[Union[CharityProject, Donation]]
+    ) -> Tuple[ColumnElement, ...]:
+        if model is CharityProject:
+            return (
+                CharityProject.remaining_amount.expression,
+                *super().order_by(model)
+            )
+        return super().order_by(model)
+
+
+STRATEGIES: Dict[str, AllocationStrategy] = {
+    strategy.name: strategy for strategy in (
+        AllocationStrategy('fifo'),
+        SmallestRemainingStrategy('smallest_remaining'),
+        AllocationStrategy(
+            'proportional', allocate_proportional,
+            whole_queue=True, sql_supported=False
+        ),
+    )
+}
+
+
+def get_strategy() -> AllocationStrategy:
+    """
+    Возвращает стратегию распределения, выбранную в настройках.
+
+    Returns:
+        AllocationStrategy: Текущая стратегия.
+    """
+    return STRATEGIES[settings.investment_strategy]
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.services.investment import investment
+
+logger = logging.getLogger(__name__)
+
+
+class InvestmentWorker:
+    """
+    Фоновый обработчик, распределяющий средства вне обработки запросов.
+
+    Сигналы, поступившие в пределах окна `settings.investment_window`,
+    объединяются в один полный проход распределения. Данные, проход
+    по которым завершился ошибкой, остаются ожидающими и распределяются
+    следующим проходом. Повтор выполняется не раньше, чем через
+    `retry_delay()` секунд: пауза растет вдвое после каждой ошибки подряд
+    до `settings.investment_retry_max_delay` и сбрасывается после
+    успешного прохода.
+
+    Attributes:
+        session_factory (async_sessionmaker[AsyncSession]): Фабрика сессий,
+            в которых выполняется распределение.
+        runs (int): Количество выполненных проходов.
+        failures (int): Количество проходов подряд, завершившихся ошибкой.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker[AsyncSession]
+    ):
+        self.session_factory = session_factory
+        self.runs = 0
+        self.failures = 0
+        self._retry_at = 0.0
+        self._requested = 0
+        self._completed = 0
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    def signal(self) -> None:
+        """
+        Сообщает о новых данных для распределения.
+        """
+        self._requested += 1
+        if self._task is not None:
+            self._wakeup.set()
+
+    def retry_delay(self) -> float:
+        """
+        Вычисляет паузу перед повтором после последней ошибки.
+
+        Returns:
+            float: Пауза в секундах; 0, если последний проход успешен.
+        """
+        if not self.failures:
+            return 0.0
+        return min(
+            settings.investment_retry_delay * 2 ** (self.failures - 1),
+            settings.investment_retry_max_delay
+        )
+
+    async def flush(self) -> None:
+        """
+        Дожидается распределения всех данных, о которых уже сообщено.
+
+        Окно объединения при этом не выдерживается. Если обработчик
+        не запущен, проход выполняется сразу в текущей задаче. Если проход
+        завершился ошибкой, ожидание прекращается, а данные остаются
+        ожидающими до следующего прохода. Пока не истекла пауза перед
+        повтором, проход не запускается.
+        """
+        requested = self._requested
+        if self._completed >= requested:
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        if self._task is None:
+            await self._run_pass()
+            return
+        # Уже идущий проход мог начаться до поступления этих данных.
+        runs = self.runs + int(self._running)
+        self._urgent.set()
+        async with self._done:
+            await self._done.wait_for(
+                lambda: self._completed >= requested or self.runs > runs
+            )
+
+    async def start(self) -> None:
+        """
+        Запускает фоновую задачу обработчика.
+        """
+        self._wakeup = asyncio.Event()
+        self._urgent = asyncio.Event()
+        self._done = asyncio.Condition()
+        self._task = asyncio.create_task(self._loop())
+        if self._completed < self._requested:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую задачу, предварительно распределив
+        все накопленные данные.
+        """
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run_pass(self) -> bool:
+        requested = self._requested
+        self._running = True
+        try:
+            async with self.session_factory() as session:
+                await investment(session)
+        except Exception:
+            self.failures += 1
+            delay = self.retry_delay()
+            self._retry_at = time.monotonic() + delay
+            logger.exception(
+                'Не удалось распределить средства, повтор через %.1f с', delay
+            )
+            return False
+        finally:
+            self._running = False
+            self.runs += 1
+        self.failures = 0
+        self._completed = requested
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(max(self._retry_at - time.monotonic(), 0))
+            try:
+                await asyncio.wait_for(
+                    self._urgent.wait(), settings.investment_window
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._urgent.clear()
+            if not await self._run_pass():
+                self._wakeup.set()
+            async with self._done:
+                self._done.notify_all()
+
+
+investment_worker = InvestmentWorker(async_session)
@@ -0,0 +1,109 @@
+"""
+Сравнение функции `allocate` с прежним циклом по объектам ORM
+и замер пропорционального распределения `allocate_proportional`.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.allocation --donations 1000000 --projects 1000
+"""
+import argparse
+import random
+import time
+
+from app.models import CharityProject, Donation
+from app.services.allocation import (Balances, allocate,
+                                     allocate_proportional)
+
+
+def orm_loop(projects, donations):
+    """
+    Распределение в том виде, в котором оно выполнялось по объектам ORM.
+    """
+    donations = iter(donations)
+    donation = next(donations, None)
+    for project in projects:
+        while donation is not None and not project.fully_invested:
+            amount = min(
+                project.full_amount - project.invested_amount,
+                donation.full_amount - donation.invested_amount
+            )
+            for obj in (project, donation):
+                obj.invested_amount += amount
+                if obj.invested_amount == obj.full_amount:
+                    obj.fully_invested = True
+            if donation.fully_invested:
+                donation = next(donations, None)
+        if donation is None:
+            break
+
+
+def measure(name, function, *args):
+    started = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - started
+    print(f'{name:<12} {elapsed:8.3f} s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--donations', type=int, default=1_000_000)
+    parser.add_argument('--projects', type=int, default=1_000)
+    parser.add_argument(
+        '--orm-donations', type=int, default=100_000,
+        help='число пожертвований для цикла по ORM (он заметно медленнее)'
+    )
+    parser.add_argument(
+        '--proportional-donations', type=int, default=10_000,
+        help='число пожертвований для пропорционального распределения '
+             '(каждое делится между всеми проектами)'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    donation_amounts = [rng.randint(1, 1000) for _ in range(args.donations)]
+    project_amount = sum(donation_amounts) // args.projects + 1
+    print(
+        f'{args.donations} пожертвований, {args.projects} проектов '
+        f'по {project_amount}'
+    )
+
+    donations = Balances(range(1, args.donations + 1), donation_amounts)
+    projects = Balances(
+        range(1, args.projects + 1), [project_amount] * args.projects
+    )
+    kernel = measure('allocate', allocate, donations, projects)
+
+    count = min(args.orm_donations, args.donations)
+    orm_projects = [
+        CharityProject(full_amount=project_amount, invested_amount=0,
+                       fully_invested=False)
+        for _ in range(args.projects)
+    ]
+    orm_donations = [
+        Donation(full_amount=amount, invested_amount=0, fully_invested=False)
+        for amount in donation_amounts[:count]
+    ]
+    orm = measure(
+        f'orm x{count}', orm_loop, orm_projects, orm_donations
+    )
+    print(
+        f'на одно пожертвование: allocate '
+        f'{kernel / args.donations * 1e9:.0f} нс, '
+        f'orm {orm / count * 1e9:.0f} нс'
+    )
+
+    count = min(args.proportional_donations, args.donations)
+    proportional = measure(
+        f'proportional x{count}', allocate_proportional,
+        Balances(range(1, count + 1), donation_amounts[:count]), projects
+    )
+    print(
+        f'на одно пожертвование: proportional '
+        f'{proportional / count * 1e6:.0f} мкс'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Сравнение сериализации списка проектов через объекты ORM и `response_model`
+с выборкой строк Core и orjson.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.serialization --projects 100000
+"""
+import argparse
+import asyncio
+import datetime as dt
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.crud.charity_project import charityproject_crud
+from app.models import CharityProject
+from app.schemas.charity_project import CharityProjectDB
+from app.services.serialization import dump_rows, schema_fields
+
+
+async def orm_path(session):
+    """
+    Прежний путь: объекты ORM, проверка `response_model` и JSONResponse.
+    """
+    projects = (await session.scalars(select(CharityProject))).all()
+    field = create_response_field(
+        name='Response', type_=List[CharityProjectDB]
+    )
+    content = await serialize_response(
+        field=field, response_content=projects, exclude_none=True
+    )
+    return JSONResponse(content).body
+
+
+async def core_path(session):
+    """
+    Быстрый путь: строки Core и orjson.
+    """
+    fields = schema_fields(CharityProjectDB)
+    rows = await charityproject_crud.get_multi_rows(session, fields)
+    return dump_rows(rows, fields)
+
+
+async def measure(name, session_factory, function, repeat):
+    best = None
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            body = await function(session)
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:<6} {best:8.3f} s  {len(body)} байт')
+    return best, body
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(directory) / "bench.db"}'
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            now = dt.datetime.now()
+            await conn.execute(insert(CharityProject.__table__), [
+                {
+                    'name': f'Проект {number}',
+                    'description': 'Описание проекта ' * 4,
+                    'full_amount': 1000,
+                    'invested_amount': 1000 if number % 2 else 0,
+                    'fully_invested': bool(number % 2),
+                    'create_date': now,
+                    'close_date': now if number % 2 else None,
+                }
+                for number in range(args.projects)
+            ])
+        session_factory = async_sessionmaker(engine)
+        print(f'{args.projects} проектов')
+        orm, orm_body = await measure(
+            'orm', session_factory, orm_path, args.repeat
+        )
+        core, core_body = await measure(
+            'core', session_factory, core_path, args.repeat
+        )
+        await engine.dispose()
+    assert orm_body == core_body, 'Ответы быстрого и прежнего пути различаются.'
+    print(f'ускорение: {orm / core:.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--projects', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.services.preview import preview_cache
+from app.services.response_cache import project_list_cache
+
 try:
     from app.main import app
 except (NameError, ImportError):
@@ -67,6 +70,9 @@ async def override_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Версия очередей начинается заново вместе с таблицами.
+    preview_cache.clear()
+    project_list_cache.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -1,8 +1,10 @@
 import pytest
+import pytest_asyncio
 from conftest import (
     app, current_superuser, current_user, get_async_session, override_db
 )
 from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 
 from app.models.user import User
 
@@ -53,3 +55,14 @@ def superuser_client():
     app.dependency_overrides[current_superuser] = lambda: superuser
     with TestClient(app) as client:
         yield client
+
+
+@pytest_asyncio.fixture
+async def async_user_client():
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[current_user] = lambda: user
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        yield client
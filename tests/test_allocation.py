@@ -0,0 +1,145 @@
+from array import array
+from datetime import datetime
+
+from app.services.allocation import (Balances, allocate,
+                                     allocate_proportional, split)
+from app.services.donation_index import Cut, DonationIndex
+
+
+def test_allocate_fifo():
+    result = allocate(
+        Balances([1, 2, 3, 4], [150, 50, 400, 600]),
+        Balances([10, 20, 30], [200, 500, 1000]),
+    )
+    assert result.allocations == [
+        (1, 10, 150),
+        (2, 10, 50),
+        (3, 20, 400),
+        (4, 20, 100),
+        (4, 30, 500),
+    ], 'Пожертвования должны распределяться по проектам в порядке очереди.'
+    assert result.closed_donations == array('q', [1, 2, 3, 4])
+    assert result.closed_projects == array('q', [10, 20])
+    assert not result.donations_left
+    assert list(result.projects_left) == [(30, 500)], (
+        'В остатке очереди проектов должен остаться частично '
+        'профинансированный проект с непогашенной суммой.'
+    )
+
+
+def test_allocate_does_not_change_input():
+    donations = Balances([1], [100])
+    projects = Balances([10, 20], [30, 30])
+    result = allocate(donations, projects)
+    assert list(donations) == [(1, 100)] and list(projects) == [(10, 30), (20, 30)], (
+        'Функция распределения не должна изменять входные очереди.'
+    )
+    assert list(result.donations_left) == [(1, 40)]
+    assert not result.projects_left
+
+
+def test_allocate_empty_queue():
+    result = allocate(Balances(), Balances([10], [100]))
+    assert result.allocations == []
+    assert not result.closed_donations and not result.closed_projects
+    assert list(result.projects_left) == [(10, 100)], (
+        'Без пожертвований очередь проектов должна остаться без изменений.'
+    )
+
+
+def test_split_conserves_amount():
+    assert split(10, [1, 1, 1], 3) == array('q', [4, 3, 3]), (
+        'Единицы, оставшиеся после округления вниз, должны доставаться '
+        'долям, стоящим раньше в очереди, если дробные части равны.'
+    )
+    shares = split(600, [823, 165, 412], 1400)
+    assert shares == array('q', [353, 71, 176])
+    assert sum(shares) == 600, (
+        'Сумма долей должна в точности равняться распределяемой сумме.'
+    )
+
+
+def test_allocate_proportional():
+    result = allocate_proportional(
+        Balances([1, 2], [300, 600]),
+        Balances([10, 20, 30], [1000, 200, 500]),
+    )
+    assert result.allocations == [
+        (1, 10, 177), (1, 20, 35), (1, 30, 88),
+        (2, 10, 353), (2, 20, 71), (2, 30, 176),
+    ], 'Каждое пожертвование должно делиться пропорционально недостающим суммам.'
+    assert result.closed_donations == array('q', [1, 2])
+    assert not result.closed_projects
+    assert list(result.projects_left) == [(10, 470), (20, 94), (30, 236)]
+
+
+def test_allocate_proportional_closes_all_projects():
+    result = allocate_proportional(
+        Balances([1, 2, 3], [100, 700, 50]),
+        Balances([10, 20, 30], [300, 0, 450]),
+    )
+    assert result.allocations == [
+        (1, 10, 40), (1, 30, 60), (2, 10, 260), (2, 30, 390),
+    ]
+    assert result.closed_donations == array('q', [1])
+    assert sorted(result.closed_projects) == [10, 20, 30], (
+        'Пожертвование, покрывающее все недостающие суммы, должно закрыть '
+        'все проекты.'
+    )
+    assert list(result.donations_left) == [(2, 50), (3, 50)], (
+        'Остаток пожертвования после закрытия всех проектов должен '
+        'остаться в очереди.'
+    )
+    assert not result.projects_left
+
+
+def test_allocate_proportional_small_donation():
+    needs = [100] * 59 + [200]
+    result = allocate_proportional(
+        Balances([1], [3]), Balances(range(1, 61), needs)
+    )
+    assert result.allocations == [(1, 1, 1), (1, 2, 1), (1, 60, 1)], (
+        'Пожертвование меньше числа проектов должно раздаваться по единице '
+        'проектам с наибольшими долями, при равенстве - стоящим раньше.'
+    )
+    assert [
+        share for share in split(3, needs, sum(needs)) if share
+    ] == [1, 1, 1]
+    assert list(result.projects_left)[:2] == [(1, 99), (2, 99)]
+
+
+def test_donation_index_cut():
+    index = DonationIndex()
+    index.reset(
+        (obj_id, datetime(2011, 11, obj_id), amount)
+        for obj_id, amount in [(1, 150), (2, 50), (3, 400), (4, 600)]
+    )
+    assert index.cut(200) == Cut(2, (datetime(2011, 11, 2), 2), None, 0, 200), (
+        'Потребность, равная сумме префикса, должна закрывать его целиком.'
+    )
+    assert index.cut(500) == Cut(2, (datetime(2011, 11, 2), 2), 3, 300, 500), (
+        'Пожертвование на границе префикса должно вкладываться частично.'
+    )
+    assert index.cut(5000) == Cut(4, (datetime(2011, 11, 4), 4), None, 0, 1200), (
+        'Если потребность больше всей очереди, распределяется вся очередь.'
+    )
+
+
+def test_donation_index_consume():
+    index = DonationIndex()
+    index.reset(
+        (obj_id, datetime(2011, 11, obj_id), amount)
+        for obj_id, amount in [(1, 150), (2, 50), (3, 400), (4, 600)]
+    )
+    index.consume(500)
+    assert (index.count, index.amount) == (2, 700)
+    assert index.cut(50) == Cut(0, None, 3, 50, 50), (
+        'После расхода префикса поиск должен начинаться с частично '
+        'вложенного пожертвования.'
+    )
+    index.append(5, datetime(2011, 11, 5), 300)
+    assert (index.count, index.amount) == (3, 1000)
+    index.append(6, datetime(2011, 11, 1), 300)
+    assert not index.valid, (
+        'Пожертвование вне порядка FIFO должно помечать индекс устаревшим.'
+    )
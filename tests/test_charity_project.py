@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 import pytest
@@ -621,3 +622,279 @@ def test_get_all_charity_project_not_auth_user(test_client, charity_project, cha
             'name': 'nunchaku'
         }
     ]
+
+
+def test_create_project_batch(superuser_client, donation, another_donation):
+    """Созданы 2 пожертвования на 100 и 2000. Пакет из проектов на 1500 и 1000 должен сохраниться целиком и распределиться одним проходом: первый проект закрывается, во второй вкладывается 600."""
+    response = superuser_client.post('/charity_project/batch', json=[
+        {'name': 'Мертвый Бассейн', 'description': 'Deadpool inside', 'full_amount': 1500},
+        {'name': 'Плюшевый Ктулху', 'description': 'Cthulhu fhtagn', 'full_amount': 1000},
+    ])
+    assert response.status_code == 200, test_create_project_batch.__doc__
+    assert [
+        (project['name'], project['invested_amount'], project['fully_invested'])
+        for project in response.json()
+    ] == [
+        ('Мертвый Бассейн', 1500, True), ('Плюшевый Ктулху', 600, False)
+    ], test_create_project_batch.__doc__
+
+
+def test_create_project_batch_duplicate_names(superuser_client, charity_project):
+    response = superuser_client.post('/charity_project/batch', json=[
+        {'name': 'Мертвый Бассейн', 'description': 'Deadpool inside', 'full_amount': 1500},
+        {'name': 'chimichangas4life', 'description': 'Duplicate', 'full_amount': 1000},
+        {'name': 'Мертвый Бассейн', 'description': 'Duplicate', 'full_amount': 1000},
+    ])
+    assert response.status_code == 422, (
+        'Пакет с неуникальными именами проектов должен отклоняться '
+        'со статус-кодом 422.'
+    )
+    assert [error['index'] for error in response.json()['detail']] == [1, 2], (
+        'Ошибки пакета должны возвращаться по позициям элементов.'
+    )
+    assert len(superuser_client.get('/charity_project/').json()) == 1, (
+        'Если пакет отклонен, ни один проект из него не должен сохраняться.'
+    )
+
+
+def test_update_project_batch(superuser_client, charity_project, charity_project_nunchaku, small_fully_charity_project):
+    response = superuser_client.patch('/charity_project/batch', json=[
+        {'id': charity_project.id, 'full_amount': 2000000},
+        {'id': charity_project_nunchaku.id, 'name': 'chimichangas4life'},
+        {'id': small_fully_charity_project.id, 'full_amount': 5000},
+        {'id': 999, 'description': 'Missing'},
+    ])
+    assert response.status_code == 422, (
+        'Пакет с некорректными элементами должен отклоняться '
+        'со статус-кодом 422.'
+    )
+    assert [error['index'] for error in response.json()['detail']] == [1, 2, 3], (
+        'Ошибки пакета должны возвращаться по позициям элементов.'
+    )
+    response = superuser_client.patch('/charity_project/batch', json=[
+        {'id': charity_project.id, 'full_amount': 2000000},
+        {'id': charity_project_nunchaku.id, 'name': 'Nunchaku 2'},
+    ])
+    assert response.status_code == 200, (
+        'Корректный пакет обновлений должен применяться целиком.'
+    )
+    assert [
+        (project['name'], project['full_amount']) for project in response.json()
+    ] == [('chimichangas4life', 2000000), ('Nunchaku 2', 5000000)], (
+        'Корректный пакет обновлений должен применяться целиком.'
+    )
+
+
+def test_get_charity_project_pages(user_client, mixer):
+    """Созданы 5 проектов. Список по 2 проекта должен выдаваться тремя страницами, связанными курсором из заголовка X-Next-Cursor."""
+    for number in range(5):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project',
+            full_amount=100, invested_amount=0, fully_invested=False,
+        )
+    pages = []
+    params = {'limit': 2}
+    while True:
+        response = user_client.get('/charity_project/', params=params)
+        assert response.status_code == 200, test_get_charity_project_pages.__doc__
+        pages.append([project['id'] for project in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        params = {'limit': 2, 'cursor': cursor}
+    assert pages == [[1, 2], [3, 4], [5]], test_get_charity_project_pages.__doc__
+    response = user_client.get('/charity_project/', params={'after_id': 3})
+    assert [project['id'] for project in response.json()] == [4, 5], (
+        'Параметр after_id должен возвращать проекты с ID больше указанного.'
+    )
+    response = user_client.get(
+        '/charity_project/', params={'limit': 2, 'paginate': 'false'}
+    )
+    assert len(response.json()) == 5 and 'X-Next-Cursor' not in response.headers, (
+        'С параметром paginate=false должен возвращаться весь список.'
+    )
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0},
+    {'limit': 100000},
+    {'cursor': '!!!'},
+    {'cursor': 'MQ', 'after_id': 1},
+    {'cursor': 'WzEsMl0', 'order_by': 'id'},
+    {'after_id': 1, 'order_by': 'remaining'},
+])
+def test_get_charity_project_invalid_page(user_client, params):
+    response = user_client.get('/charity_project/', params=params)
+    assert response.status_code == 422, (
+        'Некорректные параметры страницы должны отклоняться '
+        'со статус-кодом 422.'
+    )
+
+
+def test_export_charity_projects(superuser_client, charity_project, charity_project_nunchaku):
+    """Выгрузка должна отдавать все проекты в формате NDJSON с теми же полями, что и список проектов."""
+    response = superuser_client.get('/charity_project/export')
+    assert response.status_code == 200, test_export_charity_projects.__doc__
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == superuser_client.get('/charity_project/').json(), (
+        test_export_charity_projects.__doc__
+    )
+
+
+def test_get_charity_projects_cached(superuser_client, charity_project):
+    """Повторный запрос списка проектов должен отдаваться из кэша, а после создания проекта список должен строиться заново."""
+    first = superuser_client.get('/charity_project/')
+    second = superuser_client.get('/charity_project/')
+    assert first.json() == second.json(), test_get_charity_projects_cached.__doc__
+    stats = superuser_client.get('/summary/cache').json()
+    assert (stats['hits'], stats['misses']) == (1, 1), (
+        test_get_charity_projects_cached.__doc__
+    )
+    superuser_client.post('/charity_project/', json={
+        'name': 'Nunchaku 3',
+        'description': 'Nunchaku for all',
+        'full_amount': 100,
+    })
+    response = superuser_client.get('/charity_project/')
+    assert [project['name'] for project in response.json()] == [
+        'chimichangas4life', 'Nunchaku 3'
+    ], test_get_charity_projects_cached.__doc__
+    stats = superuser_client.get('/summary/cache').json()
+    assert (stats['hits'], stats['misses']) == (1, 2), (
+        test_get_charity_projects_cached.__doc__
+    )
+
+
+def test_get_charity_projects_gzip(superuser_client, mixer):
+    """Большой список проектов должен отдаваться сжатым клиенту, принимающему gzip."""
+    for number in range(20):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project' * 20,
+            full_amount=100, invested_amount=0, fully_invested=False,
+        )
+    response = superuser_client.get(
+        '/charity_project/', headers={'Accept-Encoding': 'gzip'}
+    )
+    assert response.headers.get('content-encoding') == 'gzip', (
+        test_get_charity_projects_gzip.__doc__
+    )
+    assert len(response.json()) == 20, test_get_charity_projects_gzip.__doc__
+    gzip_etag = response.headers['ETag']
+    response = superuser_client.get(
+        '/charity_project/', headers={'Accept-Encoding': 'identity'}
+    )
+    assert response.headers['ETag'] != gzip_etag, (
+        'ETag сжатого и несжатого ответа должны различаться.'
+    )
+    assert 'content-encoding' not in response.headers, (
+        'Клиенту, не принимающему gzip, список должен отдаваться без сжатия.'
+    )
+    assert len(response.json()) == 20, (
+        'Клиенту, не принимающему gzip, список должен отдаваться без сжатия.'
+    )
+
+
+def test_get_cache_stats_usual_user(user_client):
+    response = user_client.get('/summary/cache')
+    assert response.status_code == 401, (
+        'Счетчики кэша должны быть доступны только суперпользователю.'
+    )
+
+
+def test_get_charity_projects_not_modified(superuser_client, charity_project):
+    """Список проектов должен отвечать 304 на запрос с совпадающим If-None-Match, пока проекты не изменились."""
+    etag = superuser_client.get('/charity_project/').headers['ETag']
+    response = superuser_client.get(
+        '/charity_project/', headers={'If-None-Match': f'"other", {etag}'}
+    )
+    assert response.status_code == 304, test_get_charity_projects_not_modified.__doc__
+    assert response.headers['ETag'] == etag, test_get_charity_projects_not_modified.__doc__
+    superuser_client.patch(
+        f'/charity_project/{charity_project.id}', json={'full_amount': 2000000}
+    )
+    response = superuser_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'После изменения проекта список должен отдаваться заново.'
+    )
+    assert response.json()[0]['full_amount'] == 2000000, (
+        'После изменения проекта список должен отдаваться заново.'
+    )
+
+
+def test_get_charity_projects_by_remaining(superuser_client, mixer):
+    """Открытые проекты должны выдаваться по возрастанию недостающей суммы, страницами, связанными курсором, даже если последний проект страницы удален до запроса следующей."""
+    for number, (full_amount, invested_amount) in enumerate(
+        [(1000, 100), (500, 500), (300, 0), (800, 700), (600, 300)]
+    ):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project',
+            full_amount=full_amount, invested_amount=invested_amount,
+            fully_invested=full_amount == invested_amount,
+        )
+    pages = []
+    params = {'fully_invested': 'false', 'order_by': 'remaining', 'limit': 2}
+    while True:
+        response = superuser_client.get('/charity_project/', params=params)
+        assert response.status_code == 200, test_get_charity_projects_by_remaining.__doc__
+        pages.append([project['id'] for project in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        params = dict(params, cursor=cursor)
+        superuser_client.delete(f'/charity_project/{pages[-1][-1]}')
+    assert pages == [[4, 3], [5, 1]], test_get_charity_projects_by_remaining.__doc__
+    assert 'remaining_amount' not in response.json()[0], (
+        'Недостающая сумма не должна выдаваться в списке проектов.'
+    )
+    response = superuser_client.get(
+        '/charity_project/', params={'fully_invested': 'true'}
+    )
+    assert [project['id'] for project in response.json()] == [2], (
+        'Параметр fully_invested=true должен оставлять только закрытые проекты.'
+    )
+    response = superuser_client.get(
+        '/charity_project/', params={'order_by': 'name'}
+    )
+    assert response.status_code == 422, (
+        'Неизвестный порядок сортировки должен отклоняться '
+        'со статус-кодом 422.'
+    )
+
+
+def test_get_charity_project_by_id(test_client, charity_project):
+    """Проект должен быть доступен по ID даже неавторизованному пользователю."""
+    response = test_client.get(f'/charity_project/{charity_project.id}')
+    assert response.status_code == 200, test_get_charity_project_by_id.__doc__
+    assert response.json() == {
+        'create_date': '2010-10-10T00:00:00',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 1000000,
+        'fully_invested': False,
+        'id': charity_project.id,
+        'invested_amount': 0,
+        'name': 'chimichangas4life'
+    }, test_get_charity_project_by_id.__doc__
+    response = test_client.get('/charity_project/100')
+    assert response.status_code == 404, (
+        'Запрос несуществующего проекта должен возвращать статус-код 404.'
+    )
+
+
+def test_get_charity_projects_exclude_description(test_client, charity_project, charity_project_nunchaku):
+    """С параметром exclude=description список проектов не должен содержать описания."""
+    response = test_client.get(
+        '/charity_project/', params={'exclude': 'description'}
+    )
+    assert [sorted(project) for project in response.json()] == [sorted([
+        'create_date', 'full_amount', 'fully_invested', 'id',
+        'invested_amount', 'name'
+    ])] * 2, test_get_charity_projects_exclude_description.__doc__
+    response = test_client.get('/charity_project/')
+    assert all('description' in project for project in response.json()), (
+        'Без параметра exclude список проектов должен содержать описания.'
+    )
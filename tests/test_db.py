@@ -1,4 +1,11 @@
-from conftest import BASE_DIR
+import pytest
+from conftest import BASE_DIR, TestingSessionLocal
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+
+from app.models import CharityProject, Donation
+from app.services.investment import open_balances
+from app.services.strategies import STRATEGIES
 
 
 try:
@@ -50,3 +57,38 @@ def test_check_db_url():
             assert 'sqlite+aiosqlite' in attr_value['default'], (
                 'Укажите значение по умолчанию для подключения базы данных sqlite '
             )
+
+
+@pytest.mark.parametrize('model', [CharityProject, Donation])
+async def test_open_queue_uses_partial_index(model):
+    query = open_balances(model).compile(
+        dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}
+    )
+    async with TestingSessionLocal() as session:
+        plan = await session.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = ' '.join(row[-1] for row in plan)
+    assert f'ix_{model.__tablename__}_open_queue' in details, (
+        'Очередь открытых объектов должна читаться по частичному индексу '
+        '`(create_date, id) WHERE fully_invested = 0`.'
+    )
+    assert 'TEMP B-TREE' not in details, (
+        'Очередь открытых объектов не должна сортироваться отдельно от индекса.'
+    )
+
+
+async def test_smallest_remaining_queue_uses_index():
+    strategy = STRATEGIES['smallest_remaining']
+    query = open_balances(
+        CharityProject, strategy.order_by(CharityProject)
+    ).compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True})
+    async with TestingSessionLocal() as session:
+        plan = await session.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = ' '.join(row[-1] for row in plan)
+    assert 'ix_charityproject_open_remaining' in details, (
+        'Очередь открытых проектов по недостающей сумме должна читаться '
+        'по индексу `(remaining_amount, create_date, id) '
+        'WHERE fully_invested = 0`.'
+    )
+    assert 'TEMP B-TREE' not in details, (
+        'Очередь открытых проектов не должна сортироваться отдельно от индекса.'
+    )
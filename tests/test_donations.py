@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 import pytest
@@ -178,3 +179,178 @@ def test_create_donation_check_create_date(user_client):
     assert response_1.json()['create_date'] != response_2.json()['create_date'], (
         'При создании двух пожертвований с паузой (в 1 секунду, например) у них должны быть разные `create_date`'
     )
+
+
+def test_create_donation_batch(user_client, charity_project):
+    """Открыт проект на 1000000. Пакет пожертвований на 400000, 500000 и 300000 должен сохраниться целиком и распределиться одним проходом: первые два вкладываются полностью, из третьего - 100000."""
+    response = user_client.post('/donation/batch', json=[
+        {'full_amount': 400000},
+        {'full_amount': 500000, 'comment': 'To you for chimichangas'},
+        {'full_amount': 300000},
+    ])
+    assert response.status_code == 200, test_create_donation_batch.__doc__
+    assert response.json() == [
+        {'id': 1, 'invested_amount': 400000, 'fully_invested': True},
+        {'id': 2, 'invested_amount': 500000, 'fully_invested': True},
+        {'id': 3, 'invested_amount': 100000, 'fully_invested': False},
+    ], test_create_donation_batch.__doc__
+    assert charity_project.fully_invested, test_create_donation_batch.__doc__
+    assert user_client.get('/summary/').json()['open_donation_amount'] == 200000, (
+        'Пакетное создание пожертвований должно учитываться в сводке.'
+    )
+
+
+@pytest.mark.parametrize('json', [
+    [],
+    [{'full_amount': 100}, {'full_amount': -1}],
+    [{'full_amount': 100}, {'comment': 'To you for chimichangas'}],
+])
+def test_create_donation_batch_incorrect(user_client, json):
+    response = user_client.post('/donation/batch', json=json)
+    assert response.status_code == 422, (
+        'Пакет с некорректным пожертвованием должен отклоняться '
+        'со статус-кодом 422.'
+    )
+    assert user_client.get('/donation/my').json() == [], (
+        'Если пакет отклонен, ни одно пожертвование из него '
+        'не должно сохраняться.'
+    )
+
+
+def test_get_all_donations_pages(superuser_client, donation, another_donation):
+    response = superuser_client.get('/donation/', params={'limit': 1})
+    assert [item['id'] for item in response.json()] == [donation.id], (
+        'Страница списка пожертвований не должна превышать limit.'
+    )
+    cursor = response.headers['X-Next-Cursor']
+    response = superuser_client.get('/donation/', params={'limit': 1, 'cursor': cursor})
+    assert [item['id'] for item in response.json()] == [another_donation.id], (
+        'Курсор должен вести на следующую страницу списка пожертвований.'
+    )
+    assert 'X-Next-Cursor' not in response.headers, (
+        'У последней страницы не должно быть курсора следующей.'
+    )
+
+
+def test_export_donations(superuser_client, donation, another_donation):
+    """Выгрузка должна отдавать все пожертвования в формате NDJSON с теми же полями, что и список пожертвований."""
+    response = superuser_client.get('/donation/export')
+    assert response.status_code == 200, test_export_donations.__doc__
+    assert response.headers['content-type'] == 'application/x-ndjson', (
+        test_export_donations.__doc__
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == superuser_client.get(
+        '/donation/', params={'paginate': 'false'}
+    ).json(), test_export_donations.__doc__
+
+
+def test_export_donations_superuser_only(user_client, donation):
+    response = user_client.get('/donation/export')
+    assert response.status_code == 401, (
+        'Выгрузка пожертвований должна быть доступна только суперюзерам.'
+    )
+
+
+def test_get_user_donations_not_modified(user_client, donation):
+    """Список пожертвований пользователя должен отдавать ETag и отвечать 304 на запрос с совпадающим If-None-Match, пока пожертвования не изменились."""
+    response = user_client.get('/donation/my')
+    etag = response.headers.get('ETag')
+    assert etag, test_get_user_donations_not_modified.__doc__
+    response = user_client.get('/donation/my', headers={'If-None-Match': etag})
+    assert response.status_code == 304, test_get_user_donations_not_modified.__doc__
+    assert response.content == b'', test_get_user_donations_not_modified.__doc__
+    user_client.post('/donation/', json={'full_amount': 100})
+    response = user_client.get('/donation/my', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and len(response.json()) == 2, (
+        'После создания пожертвования список должен отдаваться заново.'
+    )
+    assert response.headers['ETag'] != etag, (
+        'После создания пожертвования ETag списка должен измениться.'
+    )
+
+
+def test_get_all_donations_not_modified(superuser_client, donation):
+    etag = superuser_client.get('/donation/').headers['ETag']
+    response = superuser_client.get('/donation/', headers={'If-None-Match': etag})
+    assert response.status_code == 304, (
+        'На запрос с совпадающим If-None-Match список пожертвований '
+        'должен отвечать 304.'
+    )
+    response = superuser_client.get(
+        '/donation/', params={'limit': 1}, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'ETag должен зависеть от параметров страницы.'
+    )
+
+
+def test_get_user_donations_pages(user_client, mixer):
+    """Пожертвования пользователя должны выдаваться страницами в порядке ID, без чужих пожертвований, с фильтром по состоянию."""
+    for number in range(5):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1 if number == 2 else 2, full_amount=100,
+            invested_amount=100 if number % 2 else 0,
+            fully_invested=bool(number % 2),
+        )
+    pages = []
+    params = {'limit': 2}
+    while True:
+        response = user_client.get('/donation/my', params=params)
+        assert response.status_code == 200, test_get_user_donations_pages.__doc__
+        pages.append([donation['id'] for donation in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        params = {'limit': 2, 'cursor': cursor}
+    assert pages == [[1, 2], [4, 5]], test_get_user_donations_pages.__doc__
+    for status, ids in (('open', [1, 5]), ('closed', [2, 4])):
+        response = user_client.get('/donation/my', params={'status': status})
+        assert [donation['id'] for donation in response.json()] == ids, (
+            test_get_user_donations_pages.__doc__
+        )
+    response = user_client.get('/donation/my', params={'status': 'other'})
+    assert response.status_code == 422, (
+        'Неизвестное состояние пожертвования должно отклоняться '
+        'со статус-кодом 422.'
+    )
+
+
+def test_get_donation(user_client, donation, another_donation):
+    """Автор должен получать свое пожертвование по ID, а чужое пожертвование должно отвечать 404."""
+    response = user_client.get(f'/donation/{donation.id}')
+    assert response.status_code == 200, test_get_donation.__doc__
+    assert response.json() == {
+        'comment': 'To you for chimichangas',
+        'create_date': '2011-11-11T00:00:00',
+        'full_amount': 100,
+        'id': donation.id,
+        'invested_amount': 0,
+        'fully_invested': False,
+        'user_id': 2,
+    }, test_get_donation.__doc__
+    response = user_client.get(f'/donation/{another_donation.id}')
+    assert response.status_code == 404, test_get_donation.__doc__
+
+
+def test_get_donations_exclude_comment(superuser_client, donation, another_donation):
+    """С параметром exclude=comment список пожертвований не должен содержать комментарии."""
+    response = superuser_client.get('/donation/', params={'exclude': 'comment'})
+    assert response.status_code == 200, test_get_donations_exclude_comment.__doc__
+    assert len(response.json()) == 2, test_get_donations_exclude_comment.__doc__
+    assert all('comment' not in item for item in response.json()), (
+        test_get_donations_exclude_comment.__doc__
+    )
+
+
+def test_get_user_donations_exclude_comment(user_client, donation):
+    response = user_client.get('/donation/my', params={'exclude': 'comment'})
+    assert response.json() == [{
+        'create_date': '2011-11-11T00:00:00',
+        'full_amount': 100,
+        'id': 1,
+    }], (
+        'С параметром exclude=comment список пожертвований пользователя '
+        'не должен содержать комментарии.'
+    )
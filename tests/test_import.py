@@ -0,0 +1,106 @@
+import io
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.cli import build_parser
+from app.models import CharityProject, Donation
+from app.services.importer import import_donations, parse_donations
+
+CSV_DATA = '''user_id,full_amount,comment,create_date
+2,400000,,2011-11-01T00:00:00
+2,500000,To you for chimichangas,2011-11-02T00:00:00
+3,300000,,2011-11-03T00:00:00
+'''
+
+NDJSON_DATA = '''{"user_id": 2, "full_amount": 400000, "create_date": "2011-11-01T00:00:00"}
+{"user_id": 2, "full_amount": 500000, "comment": "To you for chimichangas", "create_date": "2011-11-02T00:00:00"}
+
+{"user_id": 3, "full_amount": 300000, "create_date": "2011-11-03T00:00:00"}
+'''
+
+
+@pytest.mark.parametrize('fmt, data', [('csv', CSV_DATA), ('ndjson', NDJSON_DATA)])
+async def test_import_donations(fmt, data, charity_project):
+    """Открыт проект на 1000000. Импорт пожертвований на 400000, 500000 и 300000 порциями по 2 должен сохранить все записи и в конце распределить средства."""
+    reported = []
+    total = await import_donations(
+        TestingSessionLocal, parse_donations(io.StringIO(data), fmt),
+        chunk_size=2, progress=lambda rows, elapsed: reported.append(rows)
+    )
+    assert total == 3, test_import_donations.__doc__
+    assert reported == [2, 3], (
+        'Ход импорта должен сообщаться после каждой порции.'
+    )
+    async with TestingSessionLocal() as session:
+        donations = (await session.execute(
+            select(
+                Donation.user_id, Donation.comment,
+                Donation.invested_amount, Donation.fully_invested
+            ).order_by(Donation.id)
+        )).all()
+    assert donations == [
+        (2, None, 400000, True),
+        (2, 'To you for chimichangas', 500000, True),
+        (3, None, 100000, False),
+    ], test_import_donations.__doc__
+
+
+def test_import_invalid_record():
+    data = '{"user_id": 2, "full_amount": 100}\n{"user_id": 2, "full_amount": -1}\n'
+    with pytest.raises(ValueError, match='Запись 2'):
+        list(parse_donations(io.StringIO(data), 'ndjson'))
+
+
+@pytest.mark.parametrize('args', [
+    ['import-donations', 'donations.csv', '--chunk-size', '0'],
+    ['import-donations', 'donations.csv', '--chunk-size', 'abc'],
+    ['import-donations', 'donations.csv', '--match-every', '-1'],
+    ['import-donations', 'donations.csv', '--match-every', '0'],
+    ['replay', '--chunk-size', '-5'],
+])
+def test_cli_rejects_non_positive_sizes(args, capsys):
+    """Размер порции и частота распределения должны быть целыми числами больше нуля."""
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(args)
+    assert 'ожидается целое число больше нуля' in capsys.readouterr().err, (
+        test_cli_rejects_non_positive_sizes.__doc__
+    )
+
+
+def test_cli_import_defaults():
+    args = build_parser().parse_args(['import-donations', 'donations.csv'])
+    assert (args.chunk_size, args.match_every) == (1000, None), (
+        'Без --match-every средства распределяются только в конце импорта.'
+    )
+
+
+async def test_cli_match(mixer, monkeypatch, capsys):
+    """Команда match должна распределить остатки, которые ждут полного прохода, и напечатать количество открытых объектов."""
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life', description='Huge fan of chimichangas',
+        full_amount=1000, invested_amount=0, fully_invested=False,
+        close_date=None,
+    )
+    for _ in range(3):
+        mixer.blend(
+            'app.models.donation.Donation', full_amount=500, invested_amount=0,
+            fully_invested=False, close_date=None,
+        )
+    monkeypatch.setattr('app.cli.async_session', TestingSessionLocal)
+    args = build_parser().parse_args(['match'])
+    await args.handler(args)
+    async with TestingSessionLocal() as session:
+        project = await session.scalar(select(CharityProject))
+        donations = (await session.execute(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )).scalars().all()
+    assert (project.invested_amount, project.fully_invested) == (1000, True), (
+        test_cli_match.__doc__
+    )
+    assert donations == [500, 500, 0], test_cli_match.__doc__
+    assert 'Открытых пожертвований: 1, открытых проектов: 0' in (
+        capsys.readouterr().out
+    ), test_cli_match.__doc__
@@ -1,4 +1,16 @@
+import asyncio
+from datetime import datetime
+
 import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, FundsSummary, Investment
+from app.services.donation_index import donation_index
+from app.services.strategies import get_strategy
+from app.services.investment import investment, sql_investment
+from app.services.worker import InvestmentWorker, investment_worker
 
 
 def test_donation_exist_non_project(superuser_client, donation):
@@ -45,3 +57,474 @@ def test_donation_to_little_invest_project(user_client, charity_project_little_i
     assert charity_project_little_invested.invested_amount == 1000, test_donation_to_little_invest_project.__doc__
     assert not charity_project_nunchaku.fully_invested, test_donation_to_little_invest_project.__doc__
     assert charity_project_nunchaku.invested_amount == 0, test_donation_to_little_invest_project.__doc__
+
+
+def test_new_project_takes_only_needed_donations(superuser_client, donation, another_donation):
+    """Созданы 2 пожертвования на 100 и 2000. Тест создает проект на 1500. Первое пожертвование должно закрыться, из второго должно быть вложено 1400."""
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1500,
+    })
+    data = response.json()
+    assert data['fully_invested'], test_new_project_takes_only_needed_donations.__doc__
+    assert data['invested_amount'] == 1500, test_new_project_takes_only_needed_donations.__doc__
+    assert donation.fully_invested, test_new_project_takes_only_needed_donations.__doc__
+    assert another_donation.invested_amount == 1400, test_new_project_takes_only_needed_donations.__doc__
+    assert not another_donation.fully_invested, test_new_project_takes_only_needed_donations.__doc__
+
+
+@pytest.fixture
+def open_funds(mixer):
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project',
+            full_amount=full_amount, invested_amount=invested_amount,
+            fully_invested=False, close_date=None,
+            create_date=datetime(2010, 10, number),
+        )
+        for number, (full_amount, invested_amount) in enumerate(
+            [(300, 100), (500, 0), (1000, 0)], start=1
+        )
+    ]
+    donations = [
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2, full_amount=full_amount,
+            invested_amount=invested_amount, fully_invested=False,
+            close_date=None, create_date=datetime(2011, 11, number),
+        )
+        for number, (full_amount, invested_amount) in enumerate(
+            [(150, 0), (100, 50), (400, 0), (600, 0)], start=1
+        )
+    ]
+    return projects, donations
+
+
+@pytest.mark.parametrize('engine', ['python', 'sql'])
+async def test_full_pass_engines(engine, open_funds, monkeypatch):
+    """Открыты 3 проекта с остатками 200, 500, 1000 и 4 пожертвования с остатками 150, 50, 400, 600. Полный проход должен закрыть все пожертвования и первые два проекта, а в третий вложить 500."""
+    monkeypatch.setattr(settings, 'investment_engine', engine)
+    async with TestingSessionLocal() as session:
+        await investment(session)
+        assert not session.identity_map, (
+            'Полный проход не должен загружать объекты в сессию.'
+        )
+        ledger = (await session.execute(
+            select(Investment.donation_id, Investment.project_id, Investment.amount)
+            .order_by(Investment.id)
+        )).all()
+    assert ledger == [(1, 1, 150), (2, 1, 50), (3, 2, 400), (4, 2, 100), (4, 3, 500)], (
+        'Каждый перевод средств должен записываться в журнал распределения.'
+    )
+    projects, donations = open_funds
+    assert [
+        (project.invested_amount, project.fully_invested, project.close_date is not None)
+        for project in projects
+    ] == [(300, True, True), (500, True, True), (500, False, False)], test_full_pass_engines.__doc__
+    assert all(
+        donation.fully_invested and donation.invested_amount == donation.full_amount
+        and donation.close_date is not None
+        for donation in donations
+    ), test_full_pass_engines.__doc__
+    assert len({donation.close_date for donation in donations}) == 1, (
+        'Все объекты, закрытые за один проход, должны получать одну дату закрытия.'
+    )
+
+
+async def sql_pass_steps(projects):
+    """Число шагов виртуальной машины SQLite за полный проход механизма 'sql' по projects проектам на 1000 и 10 * projects пожертвованиям по 100."""
+    steps = []
+    async with TestingSessionLocal() as session:
+        await session.execute(insert(CharityProject.__table__), [
+            {'name': f'project {number}', 'description': 'description',
+             'full_amount': 1000, 'invested_amount': 0, 'fully_invested': False,
+             'create_date': datetime(2011, 11, 1)}
+            for number in range(projects)
+        ])
+        await session.execute(insert(Donation.__table__), [
+            {'user_id': 1, 'full_amount': 100, 'invested_amount': 0,
+             'fully_invested': False, 'create_date': datetime(2011, 11, 1)}
+            for _ in range(10 * projects)
+        ])
+        connection = await (await session.connection()).get_raw_connection()
+        driver_connection = connection.driver_connection
+        await driver_connection.set_progress_handler(lambda: steps.append(1), 100)
+        try:
+            assert await sql_investment(session, get_strategy()) == 1000 * projects
+        finally:
+            await driver_connection.set_progress_handler(None, 0)
+        assert await session.scalar(select(func.count()).select_from(Investment)) == 10 * projects
+        await session.rollback()
+    return len(steps)
+
+
+async def test_sql_pass_scales_linearly():
+    """Работа полного прохода механизма 'sql', включая запись журнала, должна расти линейно с числом открытых объектов: в 4 раза больше объектов - не больше чем в 6 раз больше шагов."""
+    small = await sql_pass_steps(100)
+    large = await sql_pass_steps(400)
+    assert large < 6 * small, test_sql_pass_scales_linearly.__doc__
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3])
+async def test_full_pass_small_chunks(chunk_size, open_funds, monkeypatch):
+    """Полный проход, читающий очереди маленькими порциями, должен давать тот же результат, что и проход одной порцией."""
+    monkeypatch.setattr(settings, 'investment_engine', 'python')
+    monkeypatch.setattr(settings, 'investment_chunk_size', chunk_size)
+    async with TestingSessionLocal() as session:
+        await investment(session)
+    projects, donations = open_funds
+    assert [project.invested_amount for project in projects] == [300, 500, 500], (
+        test_full_pass_small_chunks.__doc__
+    )
+    assert [project.fully_invested for project in projects] == [True, True, False], (
+        test_full_pass_small_chunks.__doc__
+    )
+    assert all(donation.fully_invested for donation in donations), (
+        test_full_pass_small_chunks.__doc__
+    )
+
+
+def test_project_investments(superuser_client, donation, another_donation):
+    """Созданы 2 пожертвования на 100 и 2000. Тест создает проект на 1500. В журнале проекта должны быть оба пожертвования с суммами 100 и 1400."""
+    project = superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1500,
+    }).json()
+    response = superuser_client.get(f'/charity_project/{project["id"]}/investments')
+    assert response.status_code == 200, test_project_investments.__doc__
+    assert [
+        (item['donation_id'], item['project_id'], item['amount'])
+        for item in response.json()
+    ] == [(1, project['id'], 100), (2, project['id'], 1400)], test_project_investments.__doc__
+    response = superuser_client.get('/charity_project/999/investments')
+    assert response.status_code == 404, (
+        'Запрос журнала несуществующего проекта должен возвращать статус-код 404.'
+    )
+
+
+def test_donation_investments(user_client, charity_project, another_donation):
+    """Создан проект. Пользователь делает пожертвование и должен видеть, куда оно вложено, но не видеть чужие пожертвования."""
+    donation = user_client.post('/donation/', json={'full_amount': 500}).json()
+    response = user_client.get(f'/donation/{donation["id"]}/investments')
+    assert response.status_code == 200, test_donation_investments.__doc__
+    assert [
+        (item['project_id'], item['amount']) for item in response.json()
+    ] == [(charity_project.id, 500)], test_donation_investments.__doc__
+    response = user_client.get(f'/donation/{another_donation.id}/investments')
+    assert response.status_code == 404, test_donation_investments.__doc__
+
+
+def test_deferred_investment(user_client, charity_project, monkeypatch):
+    """В отложенном режиме 5 пожертвований по 100 должны быть распределены одним проходом фонового обработчика перед ответом на GET-запрос."""
+    monkeypatch.setattr(settings, 'investment_deferred', True)
+    monkeypatch.setattr(settings, 'investment_window', 60)
+    monkeypatch.setattr(investment_worker, 'session_factory', TestingSessionLocal)
+    runs = investment_worker.runs
+    for _ in range(5):
+        response = user_client.post('/donation/', json={'full_amount': 100})
+        assert response.status_code == 200, test_deferred_investment.__doc__
+    response = user_client.get('/charity_project/')
+    assert response.json()[0]['invested_amount'] == 500, test_deferred_investment.__doc__
+    assert investment_worker.runs == runs + 1, test_deferred_investment.__doc__
+
+
+@pytest.mark.parametrize('started', [False, True])
+async def test_worker_retries_failed_pass(started, mixer, monkeypatch):
+    """Если проход фонового обработчика завершился ошибкой, пожертвование должно остаться ожидающим и распределиться следующим проходом, а повтор - выполняться не раньше паузы, которая удваивается после каждой ошибки до предела и сбрасывается после успеха."""
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life', description='Huge fan of chimichangas',
+        full_amount=1000, invested_amount=0, fully_invested=False,
+        close_date=None,
+    )
+    mixer.blend(
+        'app.models.donation.Donation', full_amount=100, invested_amount=0,
+        fully_invested=False, close_date=None,
+    )
+    calls = []
+
+    async def flaky_investment(session):
+        calls.append(session)
+        if len(calls) <= 2:
+            raise RuntimeError('база данных недоступна')
+        await investment(session)
+
+    async def invested_amount():
+        async with TestingSessionLocal() as session:
+            return await session.scalar(select(CharityProject.invested_amount))
+
+    monkeypatch.setattr('app.services.worker.investment', flaky_investment)
+    monkeypatch.setattr(settings, 'investment_window', 60)
+    monkeypatch.setattr(settings, 'investment_retry_delay', 0.2)
+    monkeypatch.setattr(settings, 'investment_retry_max_delay', 0.3)
+    worker = InvestmentWorker(TestingSessionLocal)
+    if started:
+        await worker.start()
+    try:
+        worker.signal()
+        await worker.flush()
+        assert (len(calls), worker.failures, worker.retry_delay()) == (1, 1, 0.2), (
+            test_worker_retries_failed_pass.__doc__
+        )
+        await worker.flush()
+        assert len(calls) == 1, (
+            'До истечения паузы проход не должен повторяться.'
+        )
+        assert await invested_amount() == 0, test_worker_retries_failed_pass.__doc__
+        await asyncio.sleep(0.25)
+        await worker.flush()
+        assert (len(calls), worker.failures, worker.retry_delay()) == (2, 2, 0.3), (
+            test_worker_retries_failed_pass.__doc__
+        )
+        await asyncio.sleep(0.15)
+        await worker.flush()
+        assert len(calls) == 2, (
+            'До истечения паузы проход не должен повторяться.'
+        )
+        await asyncio.sleep(0.2)
+        await worker.flush()
+        assert (len(calls), worker.failures, worker.retry_delay()) == (3, 0, 0), (
+            test_worker_retries_failed_pass.__doc__
+        )
+        assert await invested_amount() == 100, test_worker_retries_failed_pass.__doc__
+    finally:
+        await worker.stop()
+
+
+async def test_concurrent_donations(async_user_client, mixer):
+    """Открыт проект на 100000. 200 параллельных пожертвований по 1000 должны профинансировать его ровно на 100000 без ошибок блокировки базы данных."""
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life', description='Huge fan of chimichangas',
+        full_amount=100000, invested_amount=0, fully_invested=False,
+        close_date=None,
+    )
+    responses = await asyncio.gather(*(
+        async_user_client.post('/donation/', json={'full_amount': 1000})
+        for _ in range(200)
+    ))
+    assert all(response.status_code == 200 for response in responses), (
+        test_concurrent_donations.__doc__
+    )
+    async with TestingSessionLocal() as session:
+        project = await session.scalar(select(CharityProject))
+        donations_invested = await session.scalar(
+            select(func.sum(Donation.invested_amount))
+        )
+        donations_closed = await session.scalar(
+            select(func.count()).where(Donation.fully_invested.is_(True))
+        )
+        ledger_amount = await session.scalar(select(func.sum(Investment.amount)))
+    assert project.invested_amount == 100000 and project.fully_invested, (
+        test_concurrent_donations.__doc__
+    )
+    assert donations_invested == ledger_amount == 100000, (
+        'Сумма, вложенная из пожертвований, должна совпадать с суммой, '
+        'полученной проектом.'
+    )
+    assert donations_closed == 100, test_concurrent_donations.__doc__
+
+
+def test_summary(user_client, charity_project, charity_project_nunchaku):
+    """Открыты 2 проекта на 1000000 и 5000000. После пожертвования на 1200000 сводка должна показать один открытый проект с недостающей суммой 4800000 и ни одного открытого пожертвования."""
+    response = user_client.get('/summary/')
+    assert response.status_code == 200, test_summary.__doc__
+    assert response.json() == {
+        'open_donations': 0, 'open_donation_amount': 0,
+        'open_projects': 2, 'open_project_amount': 6000000,
+    }, test_summary.__doc__
+    user_client.post('/donation/', json={'full_amount': 1200000})
+    assert user_client.get('/summary/').json() == {
+        'open_donations': 0, 'open_donation_amount': 0,
+        'open_projects': 1, 'open_project_amount': 4800000,
+    }, test_summary.__doc__
+
+
+def test_summary_project_changes(superuser_client, charity_project, donation):
+    """Открыт проект на 1000000, пожертвование на 100 ждет распределения. Сводка должна учитывать создание, изменение и удаление проектов."""
+    superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1500,
+    })
+    superuser_client.patch(
+        f'/charity_project/{charity_project.id}', json={'full_amount': 300000}
+    )
+    assert superuser_client.get('/summary/').json() == {
+        'open_donations': 0, 'open_donation_amount': 0,
+        'open_projects': 2, 'open_project_amount': 301400,
+    }, test_summary_project_changes.__doc__
+    project = superuser_client.post('/charity_project/', json={
+        'name': 'Плюшевый Ктулху',
+        'description': 'Cthulhu fhtagn',
+        'full_amount': 2000,
+    }).json()
+    assert superuser_client.get('/summary/').json()['open_projects'] == 3, (
+        test_summary_project_changes.__doc__
+    )
+    superuser_client.delete(f'/charity_project/{project["id"]}')
+    assert superuser_client.get('/summary/').json() == {
+        'open_donations': 0, 'open_donation_amount': 0,
+        'open_projects': 2, 'open_project_amount': 301400,
+    }, test_summary_project_changes.__doc__
+
+
+@pytest.mark.parametrize('engine', ['python', 'sql'])
+async def test_summary_after_full_pass(engine, open_funds, monkeypatch):
+    """После полного прохода сводка должна совпадать с фактическими остатками открытых объектов."""
+    monkeypatch.setattr(settings, 'investment_engine', engine)
+    async with TestingSessionLocal() as session:
+        await investment(session)
+        summary = (await session.execute(select(
+            FundsSummary.open_donations, FundsSummary.open_donation_amount,
+            FundsSummary.open_projects, FundsSummary.open_project_amount,
+        ))).one()
+    assert tuple(summary) == (0, 0, 1, 500), test_summary_after_full_pass.__doc__
+
+
+async def test_investment_skipped_without_open_projects(donation, monkeypatch):
+    """Если открытых проектов нет, распределение не должно даже запрашивать блокировку записи."""
+    def fail(session):
+        raise AssertionError(test_investment_skipped_without_open_projects.__doc__)
+    monkeypatch.setattr('app.services.investment.single_writer', fail)
+    async with TestingSessionLocal() as session:
+        await investment(session)
+
+
+@pytest.mark.parametrize('stale', [False, True])
+def test_project_funded_by_prefix(stale, superuser_client, open_funds, monkeypatch):
+    """Открыты пожертвования с остатками 150, 50, 400, 600. Новый проект на 700 должен закрыть первые три пожертвования и взять 100 из четвертого, даже если индекс открытых пожертвований устарел."""
+    monkeypatch.setattr(settings, 'investment_engine', 'python')
+    projects, donations = open_funds
+    for project in projects:
+        superuser_client.delete(f'/charity_project/{project.id}')
+    if stale:
+        # Та же сводка, но другие пожертвования.
+        donation_index.reset(
+            (number + 10, datetime(2011, 11, number), 300)
+            for number in range(1, 5)
+        )
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 700,
+    })
+    data = response.json()
+    assert data['fully_invested'] and data['invested_amount'] == 700, (
+        test_project_funded_by_prefix.__doc__
+    )
+    response = superuser_client.get(f'/charity_project/{data["id"]}/investments')
+    assert [
+        (item['donation_id'], item['amount']) for item in response.json()
+    ] == [(1, 150), (2, 50), (3, 400), (4, 100)], test_project_funded_by_prefix.__doc__
+    assert [
+        (donation.invested_amount, donation.fully_invested)
+        for donation in donations
+    ] == [(150, True), (100, True), (400, True), (100, False)], (
+        test_project_funded_by_prefix.__doc__
+    )
+    assert (donation_index.count, donation_index.amount) == (1, 500), (
+        'После прохода индекс должен совпадать с открытыми пожертвованиями.'
+    )
+
+
+@pytest.mark.parametrize('stale', [False, True])
+def test_project_funded_by_whole_donations(stale, superuser_client, open_funds, monkeypatch):
+    """Открыты пожертвования с остатками 150, 50, 400, 600. Новый проект на 600 должен закрыть ровно первые три пожертвования, даже если устаревший индекс указывает на префикс с тем же числом строк, но другим остатком."""
+    monkeypatch.setattr(settings, 'investment_engine', 'python')
+    projects, donations = open_funds
+    for project in projects:
+        superuser_client.delete(f'/charity_project/{project.id}')
+    if stale:
+        # Граница префикса из двух пожертвований по 300 захватывает
+        # в таблице два пожертвования с остатками 150 и 50.
+        donation_index.reset(
+            (number + 10, datetime(2011, 11, number), 300)
+            for number in range(1, 5)
+        )
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 600,
+    })
+    data = response.json()
+    assert data['fully_invested'] and data['invested_amount'] == 600, (
+        test_project_funded_by_whole_donations.__doc__
+    )
+    response = superuser_client.get(f'/charity_project/{data["id"]}/investments')
+    assert [
+        (item['donation_id'], item['amount']) for item in response.json()
+    ] == [(1, 150), (2, 50), (3, 400)], test_project_funded_by_whole_donations.__doc__
+    assert [
+        (donation.invested_amount, donation.fully_invested)
+        for donation in donations
+    ] == [(150, True), (100, True), (400, True), (0, False)], (
+        test_project_funded_by_whole_donations.__doc__
+    )
+
+
+@pytest.fixture
+def uneven_funds(mixer):
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project',
+            full_amount=full_amount, invested_amount=0,
+            fully_invested=False, close_date=None,
+            create_date=datetime(2010, 10, number),
+        )
+        for number, full_amount in enumerate([1000, 200, 500], start=1)
+    ]
+    donations = [
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2, full_amount=full_amount, invested_amount=0,
+            fully_invested=False, close_date=None,
+            create_date=datetime(2011, 11, number),
+        )
+        for number, full_amount in enumerate([300, 600], start=1)
+    ]
+    return projects, donations
+
+
+@pytest.mark.parametrize('strategy, engine, ledger, invested', [
+    ('smallest_remaining', 'python',
+     [(1, 2, 200), (1, 3, 100), (2, 3, 400), (2, 1, 200)], [200, 200, 500]),
+    ('smallest_remaining', 'sql',
+     [(1, 2, 200), (1, 3, 100), (2, 3, 400), (2, 1, 200)], [200, 200, 500]),
+    ('proportional', 'python',
+     [(1, 1, 177), (1, 2, 35), (1, 3, 88), (2, 1, 353), (2, 2, 71), (2, 3, 176)],
+     [530, 106, 264]),
+    ('proportional', 'sql',
+     [(1, 1, 177), (1, 2, 35), (1, 3, 88), (2, 1, 353), (2, 2, 71), (2, 3, 176)],
+     [530, 106, 264]),
+])
+async def test_full_pass_strategies(strategy, engine, ledger, invested, uneven_funds, monkeypatch):
+    """Открыты проекты на 1000, 200, 500 и пожертвования на 300 и 600. Полный проход должен распределить средства по правилу выбранной стратегии; пропорциональная стратегия выполняется механизмом 'python' при любой настройке механизма."""
+    monkeypatch.setattr(settings, 'investment_engine', engine)
+    monkeypatch.setattr(settings, 'investment_strategy', strategy)
+    async with TestingSessionLocal() as session:
+        await investment(session)
+        rows = (await session.execute(
+            select(Investment.donation_id, Investment.project_id, Investment.amount)
+            .order_by(Investment.id)
+        )).all()
+        summary = (await session.execute(select(
+            FundsSummary.open_donations, FundsSummary.open_donation_amount,
+            FundsSummary.open_projects, FundsSummary.open_project_amount,
+        ))).one()
+    assert rows == ledger, test_full_pass_strategies.__doc__
+    projects, donations = uneven_funds
+    assert [project.invested_amount for project in projects] == invested, (
+        test_full_pass_strategies.__doc__
+    )
+    assert all(donation.fully_invested for donation in donations), (
+        test_full_pass_strategies.__doc__
+    )
+    assert tuple(summary) == (
+        0, 0, sum(not project.fully_invested for project in projects),
+        1700 - 900
+    ), 'Сводка должна совпадать с остатками открытых объектов при любой стратегии.'
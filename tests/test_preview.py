@@ -0,0 +1,106 @@
+from conftest import TestingSessionLocal
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, FundsSummary, Investment
+from app.services.preview import preview_cache
+
+
+def test_preview_charity_project(superuser_client, donation, another_donation):
+    """Открыты пожертвования на 100 и 2000. Прогноз для проекта на 1500 должен показать, что проект закроется сразу, израсходовав первое пожертвование и 1400 из второго, и ничего не записать в базу данных."""
+    response = superuser_client.post('/charity_project/preview', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1500,
+    })
+    assert response.status_code == 200, (
+        'Прогноз финансирования проекта должен возвращать статус-код 200.'
+    )
+    assert response.json() == {
+        'invested_amount': 1500,
+        'fully_invested': True,
+        'donations': [
+            {'donation_id': donation.id, 'amount': 100},
+            {'donation_id': another_donation.id, 'amount': 1400},
+        ],
+    }, test_preview_charity_project.__doc__
+    assert superuser_client.get('/charity_project/').json() == [], (
+        test_preview_charity_project.__doc__
+    )
+    assert [
+        item['invested_amount'] for item in superuser_client.get('/donation/').json()
+    ] == [0, 0], test_preview_charity_project.__doc__
+
+
+def test_preview_charity_project_superuser_only(user_client, donation):
+    response = user_client.post('/charity_project/preview', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1500,
+    })
+    assert response.status_code == 401, (
+        'Прогноз финансирования проекта должен быть доступен только суперюзерам.'
+    )
+
+
+def test_preview_donation(user_client, charity_project, charity_project_nunchaku):
+    """Открыты проекты на 1000000 и 5000000. Прогноз для пожертвования на 1500000 должен показать, что оно целиком распределится по обоим проектам."""
+    response = user_client.post('/donation/preview', json={
+        'full_amount': 1500000,
+    })
+    assert response.status_code == 200, (
+        'Прогноз распределения пожертвования должен возвращать статус-код 200.'
+    )
+    assert response.json() == {
+        'invested_amount': 1500000,
+        'fully_invested': True,
+        'projects': [
+            {'project_id': charity_project.id, 'amount': 1000000},
+            {'project_id': charity_project_nunchaku.id, 'amount': 500000},
+        ],
+    }, test_preview_donation.__doc__
+    assert not charity_project.fully_invested, test_preview_donation.__doc__
+
+
+async def test_preview_cached_by_queue_version(donation, mixer, monkeypatch):
+    """Повторный прогноз при неизменных очередях должен браться из кэша, а после изменения очередей - рассчитываться заново."""
+    async with TestingSessionLocal() as session:
+        first = await preview_cache.preview(session, CharityProject, 500)
+        original = preview_cache.snapshot
+        reads = []
+
+        async def count_reads(*args, **kwargs):
+            reads.append(args)
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(preview_cache, 'snapshot', count_reads)
+        assert await preview_cache.preview(session, CharityProject, 500) == first
+        assert not reads, test_preview_cached_by_queue_version.__doc__
+        version = await session.scalar(select(FundsSummary.version))
+        ledger = await session.scalar(select(func.count()).select_from(Investment))
+        assert not session.new and not session.dirty
+    assert (first.invested_amount, first.fully_invested) == (100, False)
+    assert ledger == 0, 'Прогноз не должен записывать распределение в журнал.'
+
+    mixer.blend(
+        'app.models.donation.Donation', user_id=2, full_amount=1000,
+        invested_amount=0, fully_invested=False, close_date=None,
+    )
+    async with TestingSessionLocal() as session:
+        assert await session.scalar(select(FundsSummary.version)) > version, (
+            'Создание пожертвования должно увеличивать версию очередей.'
+        )
+        second = await preview_cache.preview(session, CharityProject, 500)
+    assert reads, test_preview_cached_by_queue_version.__doc__
+    assert (second.invested_amount, second.fully_invested) == (500, True), (
+        test_preview_cached_by_queue_version.__doc__
+    )
+
+
+async def test_preview_follows_strategy(charity_project, charity_project_nunchaku, monkeypatch):
+    monkeypatch.setattr(settings, 'investment_strategy', 'proportional')
+    async with TestingSessionLocal() as session:
+        preview = await preview_cache.preview(session, Donation, 600)
+    assert preview.allocations == [
+        (charity_project.id, 100), (charity_project_nunchaku.id, 500),
+    ], 'Прогноз должен рассчитываться по стратегии распределения из настроек.'
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, FundsSummary, Investment
+from app.services.replay import Difference, replay
+
+
+@pytest.fixture
+def history(mixer):
+    """Проекты на 200 и 500, пожертвования на 150, 100 и 600 с испорченными суммами вложений."""
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}', description='Project',
+            full_amount=full_amount, invested_amount=invested_amount,
+            fully_invested=fully_invested, close_date=None,
+            create_date=datetime(2010, 10, number),
+        )
+        for number, (full_amount, invested_amount, fully_invested) in enumerate(
+            [(200, 200, True), (500, 0, False)], start=1
+        )
+    ]
+    donations = [
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2, full_amount=full_amount,
+            invested_amount=invested_amount, fully_invested=fully_invested,
+            close_date=None, create_date=datetime(2011, 11, number),
+        )
+        for number, (full_amount, invested_amount, fully_invested) in enumerate(
+            [(150, 150, True), (100, 0, False), (600, 0, False)], start=1
+        )
+    ]
+    return projects, donations
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+async def test_replay(chunk_size, history):
+    """Повторное распределение должно закрыть оба проекта и первые два пожертвования, вложить 450 из третьего и построить журнал заново."""
+    report = await replay(TestingSessionLocal, chunk_size=chunk_size)
+    assert report.allocated == 700, test_replay.__doc__
+    assert report.changed == {'donation': 2, 'charityproject': 1}, (
+        test_replay.__doc__
+    )
+    projects, donations = history
+    assert [
+        (project.invested_amount, project.fully_invested) for project in projects
+    ] == [(200, True), (500, True)], test_replay.__doc__
+    assert [
+        (donation.invested_amount, donation.fully_invested) for donation in donations
+    ] == [(150, True), (100, True), (450, False)], test_replay.__doc__
+    assert donations[1].close_date == datetime(2011, 11, 2), (
+        'Датой закрытия должна быть дата создания более позднего объекта пары.'
+    )
+    async with TestingSessionLocal() as session:
+        ledger = (await session.execute(
+            select(Investment.donation_id, Investment.project_id, Investment.amount)
+            .order_by(Investment.id)
+        )).all()
+        summary = (await session.execute(select(
+            FundsSummary.open_donations, FundsSummary.open_donation_amount,
+            FundsSummary.open_projects, FundsSummary.open_project_amount,
+        ))).one()
+    assert ledger == [(1, 1, 150), (2, 1, 50), (2, 2, 50), (3, 2, 450)], (
+        test_replay.__doc__
+    )
+    assert tuple(summary) == (1, 150, 0, 0), (
+        'После повторного распределения сводка должна быть пересчитана.'
+    )
+
+
+async def test_replay_dry_run(history):
+    """Пробный запуск должен только сообщить о расхождениях."""
+    report = await replay(TestingSessionLocal, dry_run=True)
+    assert report.differences == [
+        Difference('donation', 2, (0, False), (100, True)),
+        Difference('charityproject', 2, (0, False), (500, True)),
+        Difference('donation', 3, (0, False), (450, False)),
+    ], test_replay_dry_run.__doc__
+    async with TestingSessionLocal() as session:
+        invested = (await session.scalars(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )).all()
+        projects_closed = (await session.scalars(
+            select(CharityProject.fully_invested).order_by(CharityProject.id)
+        )).all()
+    assert invested == [150, 0, 0] and projects_closed == [True, False], (
+        test_replay_dry_run.__doc__
+    )
+
+
+@pytest.mark.parametrize('strategy', ['smallest_remaining', 'proportional'])
+async def test_replay_refuses_other_strategies(strategy, history, monkeypatch):
+    """При стратегии, отличной от fifo, повторное распределение должно отказываться работать и ничего не менять."""
+    monkeypatch.setattr(settings, 'investment_strategy', strategy)
+    with pytest.raises(ValueError, match=strategy):
+        await replay(TestingSessionLocal)
+    async with TestingSessionLocal() as session:
+        invested = (await session.scalars(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )).all()
+    assert invested == [150, 0, 0], test_replay_refuses_other_strategies.__doc__
@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.schemas.charity_project import CharityProjectDB
+from app.services.serialization import dump_ndjson, dump_rows, schema_fields
+
+
+def test_dump_rows_matches_response_model():
+    """Быстрая сериализация строк должна давать тот же JSON, что и `response_model` с `response_model_exclude_none`."""
+    fields = schema_fields(CharityProjectDB)
+    items = [
+        ('Мертвый Бассейн', 'Deadpool "inside"', 1500, 1, 0, False,
+         datetime(2010, 10, 10, 12, 30, 15, 123456), None),
+        ('chimichangas4life', 'Huge fan', 100, 2, 100, True,
+         datetime(2010, 10, 10), datetime(2010, 10, 11)),
+    ]
+    rows = items
+    adapter = TypeAdapter(List[CharityProjectDB])
+    expected = adapter.dump_python(
+        adapter.validate_python([dict(zip(fields, item)) for item in items]),
+        mode='json', exclude_none=True
+    )
+    assert json.loads(dump_rows(rows, fields)) == expected, (
+        test_dump_rows_matches_response_model.__doc__
+    )
+    assert [
+        json.loads(line) for line in dump_ndjson(rows, fields).splitlines()
+    ] == expected, test_dump_rows_matches_response_model.__doc__
+    assert 'close_date' not in json.loads(dump_rows(rows, fields))[0], (
+        test_dump_rows_matches_response_model.__doc__
+    )